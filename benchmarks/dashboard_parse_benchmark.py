@@ -0,0 +1,86 @@
+"""
+Compares the streaming dashboard parser with the former pandas + eval path
+on a synthetic repo-health dashboard: wall time and peak Python memory.
+
+Usage (from the repository root):
+    python -m benchmarks.dashboard_parse_benchmark --rows 100000
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import re
+import tempfile
+import time
+import tracemalloc
+
+from dashboard_stream import iter_dashboard_dependencies
+from org_dependencies import dependencies as org_dependencies
+
+COLUMN_NAME = 'dependencies.pypi_all.list'
+
+
+def generate_dashboard(csv_path, rows, seed=0):
+    # Dashboard with a few filler columns and a requirement list per repository
+    randomizer = random.Random(seed)
+    names = [name.split('[')[0] for name in org_dependencies]
+    with open(csv_path, 'w', newline='') as csv_file:
+        csv_writer = csv.writer(csv_file)
+        csv_writer.writerow(['repo_name', 'ownership.squad', COLUMN_NAME, 'python_versions'])
+        for row in range(rows):
+            requirements = [
+                f"{randomizer.choice(names)}=={randomizer.randint(0, 9)}.{randomizer.randint(0, 30)}.0"
+                for _ in range(randomizer.randint(0, 60))
+            ]
+            csv_writer.writerow([f"repo-{row}", 'squad', repr(requirements) if requirements else '', '3.8,3.11'])
+
+
+def legacy_parse(csv_path, column_name):
+    # The pandas + eval implementation this module replaced
+    import pandas as pd
+
+    df = pd.read_csv(csv_path)
+    all_dependencies = set()
+    for dependencies_list in df[column_name]:
+        if isinstance(dependencies_list, str):
+            dependencies = eval(dependencies_list)
+            dependency_names = [re.sub(r'\[.*\]', '', dependency.split('==')[0]) for dependency in dependencies]
+            all_dependencies.update(dependency for dependency in dependency_names if dependency != 'django')
+    return list(all_dependencies)
+
+
+def streaming_parse(csv_path, column_name):
+    return list(iter_dashboard_dependencies(csv_path, column_name))
+
+
+def measure(parse, csv_path):
+    # Timed without tracemalloc, whose overhead would skew the timings
+    started_at = time.perf_counter()
+    names = parse(csv_path, COLUMN_NAME)
+    elapsed = time.perf_counter() - started_at
+    tracemalloc.start()
+    parse(csv_path, COLUMN_NAME)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": round(elapsed, 3), "peak_bytes": peak, "unique_names": len(names)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--skip-legacy', action='store_true', help="don't run the pandas + eval path")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        csv_path = os.path.join(temp_dir, 'dashboard_main.csv')
+        generate_dashboard(csv_path, args.rows)
+        results = {"rows": args.rows, "file_bytes": os.path.getsize(csv_path)}
+        results["streaming"] = measure(streaming_parse, csv_path)
+        if not args.skip_legacy:
+            results["legacy"] = measure(legacy_parse, csv_path)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""
+Local stand-in for the parts of the GitHub APIs used by
+repo_sources.GitHubRepoSource, answering from local git repositories.
+
+Serves, for every configured owner/name:
+    GET  /repos/<owner>/<name>                       default branch
+    GET  /repos/<owner>/<name>/tags                  paginated tag list
+    GET  /repos/<owner>/<name>/compare/<base>...<head>
+    POST /graphql                                    the tag and blob queries of GitHubRepoSource
+    GET  /raw/<owner>/<name>/<ref>/<path>            file content, like raw.githubusercontent.com
+The GraphQL endpoint only understands the queries GitHubRepoSource sends.
+"""
+import json
+import re
+import subprocess
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from release_tags import list_tag_states
+
+OBJECT_SELECTION_RE = re.compile(
+    r'(\w+): object\((expression|oid): ("(?:[^"\\]|\\.)*")\) \{ \.\.\. on Blob \{ (\w+) \} \}'
+)
+
+
+def git(repo_dir, *args):
+    # Output of a git command, None if it fails
+    result = subprocess.run(['git', *args], cwd=repo_dir, capture_output=True)
+    return result.stdout if result.returncode == 0 else None
+
+
+def read_blob(repo_dir, object_name):
+    if (git(repo_dir, 'cat-file', '-t', object_name) or b'').strip() != b'blob':
+        return None
+    return git(repo_dir, 'cat-file', 'blob', object_name)
+
+
+class FakeGitHubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=b'', content_type='application/json'):
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        with self.server.stats_lock:
+            self.server.stats['requests'] += 1
+            self.server.stats['bytes_sent'] += len(body)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        parts = [unquote(part) for part in url.path.split('/') if part]
+        if len(parts) >= 5 and parts[0] == 'raw':
+            repo_dir = self.server.repos.get(f"{parts[1]}/{parts[2]}")
+            # Refs with slashes are ambiguous, like on GitHub the longest existing ref wins
+            for split in range(len(parts) - 1, 3, -1):
+                ref, path = '/'.join(parts[3:split]), '/'.join(parts[split:])
+                if repo_dir and git(repo_dir, 'rev-parse', '--verify', '-q', f"{ref}^{{commit}}"):
+                    content = read_blob(repo_dir, f"{ref}:{path}")
+                    return self._send(404, b'') if content is None else self._send(200, content, 'text/plain')
+            return self._send(404, b'')
+        if len(parts) < 3 or parts[0] != 'repos' or f"{parts[1]}/{parts[2]}" not in self.server.repos:
+            return self._send(404, {"message": "Not Found"})
+        repo_dir = self.server.repos[f"{parts[1]}/{parts[2]}"]
+        if len(parts) == 3:
+            head = (git(repo_dir, 'symbolic-ref', 'HEAD') or b'').decode('utf-8').strip()
+            return self._send(200, {"full_name": f"{parts[1]}/{parts[2]}", "default_branch": head.split('/')[-1]})
+        if parts[3:] == ['tags']:
+            query = parse_qs(url.query)
+            per_page, page = int(query.get('per_page', ['30'])[0]), int(query.get('page', ['1'])[0])
+            states = list_tag_states(repo_dir)[(page - 1) * per_page:page * per_page]
+            return self._send(200, [{"name": tag, "commit": {"sha": commit}} for tag, commit, _ in states])
+        if len(parts) >= 5 and parts[3] == 'compare':
+            base, _, head = '/'.join(parts[4:]).partition('...')
+            base_commit = git(repo_dir, 'rev-parse', '--verify', '-q', f"{base}^{{commit}}")
+            head_commit = git(repo_dir, 'rev-parse', '--verify', '-q', f"{head}^{{commit}}")
+            if not base_commit or not head_commit:
+                return self._send(404, {"message": "Not Found"})
+            if base_commit == head_commit:
+                status = 'identical'
+            elif git(repo_dir, 'merge-base', '--is-ancestor', base_commit.strip(), head_commit.strip()) is not None:
+                status = 'ahead'
+            else:
+                status = 'diverged'
+            return self._send(200, {"status": status})
+        return self._send(404, {"message": "Not Found"})
+
+    def do_POST(self):
+        if urlsplit(self.path).path.rstrip('/') != '/graphql':
+            return self._send(404, {"message": "Not Found"})
+        request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        query, variables = request['query'], request.get('variables') or {}
+        repo_dir = self.server.repos.get(f"{variables.get('owner')}/{variables.get('name')}")
+        if repo_dir is None:
+            return self._send(200, {"data": {"repository": None}, "errors": [{"type": "NOT_FOUND"}]})
+        if 'refs(refPrefix: "refs/tags/"' in query:
+            return self._send(200, {"data": {"repository": {"refs": self._tag_refs(repo_dir, query, variables)}}})
+        repository = {}
+        for alias, argument, value, field in OBJECT_SELECTION_RE.findall(query):
+            object_name = json.loads(value)
+            if field == 'oid':
+                oid = git(repo_dir, 'rev-parse', '--verify', '-q', object_name)
+                is_blob = oid and (git(repo_dir, 'cat-file', '-t', oid.strip()) or b'').strip() == b'blob'
+                repository[alias] = {"oid": oid.decode('utf-8').strip()} if is_blob else None
+            else:
+                content = read_blob(repo_dir, object_name)
+                repository[alias] = None if content is None else {"text": content.decode('utf-8', errors='replace')}
+        return self._send(200, {"data": {"repository": repository}})
+
+    def _tag_refs(self, repo_dir, query, variables):
+        page_size = int(re.search(r'first: (\d+)', query).group(1))
+        start = int(variables.get('cursor') or 0)
+        states = list_tag_states(repo_dir)
+        nodes = []
+        for tag, commit, tree in states[start:start + page_size]:
+            target = {"oid": commit, "tree": {"oid": tree}}
+            tag_object = (git(repo_dir, 'rev-parse', f"refs/tags/{tag}") or b'').decode('utf-8').strip()
+            if tag_object and tag_object != commit:
+                # Annotated tag
+                target = {"oid": tag_object, "target": target}
+            nodes.append({"name": tag, "target": target})
+        end = start + len(nodes)
+        return {"pageInfo": {"hasNextPage": end < len(states), "endCursor": str(end)}, "nodes": nodes}
+
+
+def start_fake_github(repos, port=0):
+    """
+    repos: dict mapping owner/name to local git repository paths
+    Starts the server on a background thread and returns it. The API base
+    URL is server.api_url, the raw content base URL server.raw_url; it
+    counts requests and bytes in server.stats and stops with
+    server.shutdown().
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', port), FakeGitHubHandler)
+    server.daemon_threads = True
+    server.repos = repos
+    server.stats = {"requests": 0, "bytes_sent": 0}
+    server.stats_lock = threading.Lock()
+    server.api_url = f"http://127.0.0.1:{server.server_address[1]}"
+    server.raw_url = f"{server.api_url}/raw"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,122 @@
+"""
+Local stand-in for pypi.org and the repo-health dashboard, for offline
+benchmarks.
+
+Serves, for every configured package:
+    /project/<name>/            project page, with or without the "Project links" sidebar
+    /project/<name>/<version>/  version page with the sidebar
+    /pypi/<name>/json           JSON metadata, with or without the source link
+and /dashboard_main.csv listing every package in dependencies.pypi_all.list.
+Responses carry an ETag and honour If-None-Match. A share of the requests
+can be answered with 429 and Retry-After, or slowly, to exercise the
+request scheduler.
+"""
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PROJECT_PAGE_TEMPLATE = """<html><body>
+<div class="sidebar-section">{sidebar}</div>
+<div id="history">{history}</div>
+{padding}
+</body></html>"""
+SIDEBAR_TEMPLATE = """<h3 class="sidebar-section__title">Project links</h3>
+<ul class="vertical-tabs__list"><li><a href="https://example.com/{name}">Homepage</a></li>
+<li><a href="{repo_url}">Source</a></li></ul>"""
+RELEASE_TEMPLATE = '<p class="release__version">{version}</p>'
+# Real project pages are tens of kilobytes
+PAGE_PADDING = '<p>' + 'lorem ipsum ' * 3000 + '</p>'
+
+
+class FakePyPIHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=b'', content_type='text/html'):
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        if status == 200 and self.headers.get('If-None-Match') == etag:
+            status, body = 304, b''
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if status in (200, 304):
+            self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.stats['requests'] += 1
+        self.server.stats['bytes_sent'] += len(body)
+
+    def do_GET(self):
+        faults = self.server.faults
+        if faults['randomizer'].random() < faults['throttle_rate']:
+            self.server.stats['throttled'] += 1
+            self.send_response(429)
+            self.send_header('Retry-After', str(faults['retry_after']))
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if faults['randomizer'].random() < faults['slow_rate']:
+            time.sleep(faults['slow_seconds'])
+        packages = self.server.packages
+        parts = [part for part in self.path.split('?')[0].split('/') if part]
+        if parts == ['dashboard_main.csv']:
+            return self._send(200, self.server.dashboard_csv.encode('utf-8'), 'text/csv')
+        if len(parts) < 2 or parts[1] not in packages:
+            return self._send(404)
+        name, package = parts[1], packages[parts[1]]
+        if parts[0] == 'pypi' and parts[2:] == ['json']:
+            project_urls = {"Homepage": f"https://example.com/{name}"}
+            if package.get('json_link', True):
+                project_urls["Source"] = package['repo_url']
+            metadata = {"info": {"name": name, "home_page": None, "project_urls": project_urls}}
+            return self._send(200, json.dumps(metadata).encode('utf-8'), 'application/json')
+        if parts[0] == 'project':
+            sidebar = SIDEBAR_TEMPLATE.format(name=name, repo_url=package['repo_url'])
+            is_version_page = len(parts) > 2
+            page = PROJECT_PAGE_TEMPLATE.format(
+                sidebar=sidebar if is_version_page or package.get('sidebar', True) else '',
+                history=''.join(RELEASE_TEMPLATE.format(version=version) for version in package.get('versions', [])),
+                padding=PAGE_PADDING
+            )
+            return self._send(200, page.encode('utf-8'))
+        return self._send(404)
+
+
+def dashboard_csv(package_names):
+    rows = ['repo_name,dependencies.pypi_all.list']
+    for index, name in enumerate(package_names):
+        requirements = repr([f"{name}==1.0.0"]).replace('"', '""')
+        rows.append(f'repo-{index},"{requirements}"')
+    return '\n'.join(rows) + '\n'
+
+
+def start_fake_pypi(packages, port=0, throttle_rate=0.0, retry_after=1, slow_rate=0.0, slow_seconds=0.5, seed=0):
+    """
+    packages: dict mapping names to dicts with 'repo_url' and optionally
+        'json_link' (False to leave it out of the JSON metadata), 'sidebar'
+        (False to hide the project page sidebar) and 'versions'
+    throttle_rate: share of requests answered with 429 and Retry-After: retry_after
+    slow_rate: share of requests answered after slow_seconds
+    Starts the server on a background thread and returns it; its base URL
+    is server.base_url and it stops with server.shutdown().
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', port), FakePyPIHandler)
+    server.daemon_threads = True
+    server.packages = packages
+    server.dashboard_csv = dashboard_csv(list(packages))
+    server.stats = {"requests": 0, "bytes_sent": 0, "throttled": 0}
+    server.faults = {
+        "randomizer": random.Random(seed),
+        "throttle_rate": throttle_rate,
+        "retry_after": retry_after,
+        "slow_rate": slow_rate,
+        "slow_seconds": slow_seconds
+    }
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,108 @@
+"""
+Synthetic git repositories for the offline benchmarks.
+
+Each repository has `tag_count` release tags; the classifiers of its
+setup.py gain a Django/Python version from a given release on, like real
+projects adding support over time. Repositories are written with
+`git fast-import`, so hundreds of tags take a fraction of a second.
+"""
+import os
+import random
+import subprocess
+
+DJANGO_VERSIONS = ['3.2', '4.0', '4.1', '4.2']
+PYTHON_VERSIONS = ['3.8', '3.9', '3.10', '3.11']
+
+SETUP_PY_TEMPLATE = """from setuptools import setup
+
+setup(
+    name='{name}',
+    version='{version}',
+    install_requires=['Django>=3.2'],
+    classifiers=[
+{classifiers}
+    ],
+)
+"""
+
+
+def random_support_history(tag_count, versions, randomizer):
+    # Maps each version to the index of the first tag supporting it (None if never)
+    history = {}
+    first_index = 0
+    for version in versions:
+        if first_index >= tag_count or randomizer.random() < 0.15:
+            history[version] = None
+            continue
+        first_index = randomizer.randint(first_index, max(first_index, tag_count - 1))
+        history[version] = first_index
+    return history
+
+
+def setup_py_at(name, tag_index, version, django_history, python_history):
+    classifiers = [
+        f"        'Framework :: Django :: {django_version}',"
+        for django_version, first_index in django_history.items()
+        if first_index is not None and tag_index >= first_index
+    ] + [
+        f"        'Programming Language :: Python :: {python_version}',"
+        for python_version, first_index in python_history.items()
+        if first_index is not None and tag_index >= first_index
+    ]
+    return SETUP_PY_TEMPLATE.format(name=name, version=version, classifiers='\n'.join(classifiers))
+
+
+def _data(text):
+    encoded = text.encode('utf-8')
+    return b"data %d\n" % len(encoded) + encoded + b"\n"
+
+
+def create_fixture_repo(path, name, tag_count, seed=0, django_history=None, python_history=None):
+    """
+    Creates a repository at path with tag_count release tags named 1.0.0,
+    1.0.1, ... Returns the support history it was generated from, as
+    {'django': {version: first tag or None}, 'python': {...}}.
+    """
+    randomizer = random.Random(seed)
+    django_history = django_history or random_support_history(tag_count, DJANGO_VERSIONS, randomizer)
+    python_history = python_history or random_support_history(tag_count, PYTHON_VERSIONS, randomizer)
+    os.makedirs(path, exist_ok=True)
+    subprocess.run(['git', 'init', '--quiet', '--initial-branch=main', path], check=True)
+    # Allow partial clones and lazy blob fetches over file://
+    subprocess.run(['git', 'config', 'uploadpack.allowFilter', 'true'], cwd=path, check=True)
+    subprocess.run(['git', 'config', 'uploadpack.allowAnySHA1InWant', 'true'], cwd=path, check=True)
+
+    tags = [f"1.{index // 100}.{index % 100}" for index in range(tag_count)]
+    stream = []
+    for index, tag in enumerate(tags):
+        stream.append(b"commit refs/heads/main\n")
+        stream.append(b"mark :%d\n" % (index + 1))
+        stream.append(b"committer Bench <bench@example.com> %d +0000\n" % (1600000000 + index * 3600))
+        stream.append(_data(f"Release {tag}"))
+        if index:
+            stream.append(b"from :%d\n" % index)
+        stream.append(b"M 644 inline setup.py\n")
+        stream.append(_data(setup_py_at(name, index, tag, django_history, python_history)))
+        stream.append(b"M 644 inline CHANGELOG.rst\n")
+        stream.append(_data('\n'.join(f"* {t}" for t in tags[:index + 1])))
+        stream.append(f"reset refs/tags/{tag}\nfrom :{index + 1}\n\n".encode('utf-8'))
+    subprocess.run(['git', 'fast-import', '--quiet'], cwd=path, input=b''.join(stream), check=True)
+
+    return {
+        'django': {version: tags[index] if index is not None else None for version, index in django_history.items()},
+        'python': {version: tags[index] if index is not None else None for version, index in python_history.items()}
+    }
+
+
+def create_fixture_repos(root, repo_count, tag_count, seed=0):
+    """
+    Creates repo_count repositories under root. Returns a dict mapping each
+    package name to its file:// URL and generated support history.
+    """
+    repos = {}
+    for index in range(repo_count):
+        name = f"bench-package-{index}"
+        path = os.path.join(root, name)
+        history = create_fixture_repo(path, name, tag_count, seed=seed + index)
+        repos[name] = {"repo_url": f"file://{path}", "history": history}
+    return repos
@@ -0,0 +1,73 @@
+"""
+Measures the start-up cost of the entry points: wall time of fresh
+interpreters importing each module or running a cheap cli.py command,
+and which heavy third-party modules they load. Times are medians over
+the repeats, minus a bare `python -c pass`.
+
+Usage (from the repository root):
+    python -m benchmarks.import_time_benchmark --repeat 7
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HEAVY_MODULES = ['requests', 'bs4', 'pandas', 'numpy', 'certifi']
+ENTRY_MODULES = ['cli', 'results_store', 'source_code_links_scrapper', 'main', 'compatibility_report']
+# Prints the heavy modules loaded once the code ran
+LOADED_PROBE = "import json, sys; print(json.dumps([m for m in {heavy!r} if m in sys.modules]), file=sys.stderr)"
+
+
+def time_command(command, repeat, cwd):
+    # Median wall time in ms of command, and the heavy modules of its last run
+    durations, loaded = [], []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        result = subprocess.run(command, cwd=cwd, capture_output=True, text=True)
+        durations.append((time.perf_counter() - started_at) * 1000)
+        if result.returncode != 0:
+            raise RuntimeError(f"{command} failed: {result.stderr}")
+        loaded = json.loads(result.stderr.strip().splitlines()[-1]) if result.stderr.strip() else []
+    return statistics.median(durations), loaded
+
+
+def python_code(code):
+    return [sys.executable, '-c', f"{code}\n{LOADED_PROBE.format(heavy=HEAVY_MODULES)}"]
+
+
+def cli_code(argv):
+    # Runs cli.main(argv) in-process so the loaded modules can be listed afterwards
+    return f"import sys; sys.argv = ['cli.py'] + {argv!r}\nimport cli\ntry:\n    cli.main()\nexcept SystemExit:\n    pass"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    baseline_ms, baseline_loaded = time_command(python_code('pass'), args.repeat, repo_root)
+    with tempfile.TemporaryDirectory() as work_dir:
+        updates_file = os.path.join(work_dir, 'updates.json')
+        cases = [(f"import {module}", python_code(f"import {module}")) for module in ENTRY_MODULES]
+        cases += [
+            ("cli.py --help", python_code(cli_code(['--help']))),
+            ("cli.py query show", python_code(cli_code(['query', '--updates-file', updates_file, 'show', 'django']))),
+            ("cli.py report --help", python_code(cli_code(['report', '--help']))),
+        ]
+        report = {"baseline_ms": round(baseline_ms, 1), "baseline_modules": baseline_loaded, "cases": {}}
+        for name, command in cases:
+            duration_ms, loaded = time_command(command, args.repeat, repo_root)
+            report["cases"][name] = {
+                "ms": round(duration_ms - baseline_ms, 1),
+                "heavy_modules": [module for module in loaded if module not in baseline_loaded]
+            }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
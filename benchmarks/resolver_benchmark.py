@@ -0,0 +1,82 @@
+"""
+Compares the JSON metadata and HTML scraping paths of source code link
+resolution: bytes transferred and parse time per package.
+
+Usage (from the repository root):
+    python -m benchmarks.resolver_benchmark django-waffle boto urwid
+    python -m benchmarks.resolver_benchmark --base-url http://127.0.0.1:8000 some-package
+"""
+import argparse
+import json
+import time
+
+from constants import PYPI_BASE_URL
+from pypi_scraper import (
+    create_session,
+    extract_json_source_link,
+    extract_project_links,
+    extract_release_versions,
+    REQUEST_TIMEOUT
+)
+
+
+def measure_html(session, base_url, dependency_name):
+    # Replays the HTML path: project page, then version pages until a sidebar is found
+    bytes_transferred, parse_time, requests_made = 0, 0.0, 0
+    link = None
+    urls = [f"{base_url}/project/{dependency_name}/"]
+    while urls:
+        response = session.get(urls.pop(0), timeout=REQUEST_TIMEOUT)
+        requests_made += 1
+        bytes_transferred += len(response.content)
+        started_at = time.perf_counter()
+        link = extract_project_links(response.text)
+        if not link and requests_made == 1:
+            urls = [
+                f"{base_url}/project/{dependency_name}/{version}"
+                for version in extract_release_versions(response.text)
+            ]
+        parse_time += time.perf_counter() - started_at
+        if link:
+            break
+    return {"link": link, "bytes": bytes_transferred, "parse_seconds": parse_time, "requests": requests_made}
+
+
+def measure_json(session, base_url, dependency_name):
+    response = session.get(f"{base_url}/pypi/{dependency_name}/json", timeout=REQUEST_TIMEOUT)
+    started_at = time.perf_counter()
+    link = extract_json_source_link(response.json()) if response.ok else None
+    parse_time = time.perf_counter() - started_at
+    return {"link": link, "bytes": len(response.content), "parse_seconds": parse_time, "requests": 1}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('dependencies', nargs='+')
+    parser.add_argument('--base-url', default=PYPI_BASE_URL)
+    args = parser.parse_args()
+
+    session = create_session()
+    rows = []
+    for dependency_name in args.dependencies:
+        html = measure_html(session, args.base_url.rstrip('/'), dependency_name)
+        json_ = measure_json(session, args.base_url.rstrip('/'), dependency_name)
+        rows.append({"dependency": dependency_name, "html": html, "json": json_})
+        print(
+            f"{dependency_name}: html {html['bytes']} bytes / {html['parse_seconds'] * 1000:.2f} ms "
+            f"in {html['requests']} requests, json {json_['bytes']} bytes / {json_['parse_seconds'] * 1000:.2f} ms"
+        )
+
+    totals = {
+        path: {
+            "bytes": sum(row[path]['bytes'] for row in rows),
+            "parse_seconds": sum(row[path]['parse_seconds'] for row in rows),
+            "requests": sum(row[path]['requests'] for row in rows)
+        }
+        for path in ['html', 'json']
+    }
+    print(json.dumps({"packages": rows, "totals": totals}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
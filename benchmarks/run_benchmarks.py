@@ -0,0 +1,206 @@
+"""
+Offline benchmark of the main stages of a run, on generated git
+repositories and a local PyPI stand-in, so that changes to cloning, tag
+listing, tag probing and link resolution can be compared without network
+access.
+
+Tag listing and probing also run through the GitHub API backend of
+repo_sources against a local GitHub stand-in, with an empty facts cache,
+to compare the bytes it transfers with the size of the clones.
+
+Every stage runs cold (empty caches) and warm (caches of the cold pass),
+and its wall time is reported as JSON, together with the cache stats and
+whether the first supporting releases found match the generated history.
+
+Usage (from the repository root):
+    python -m benchmarks.run_benchmarks
+    python -m benchmarks.run_benchmarks --repos 20 --tags 300 --output before.json
+    python -m benchmarks.run_benchmarks --throttle-rate 0.2 --slow-rate 0.1
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import http_cache
+import main
+import mirror_cache
+import package_metadata
+import pypi_scraper
+import rate_limits
+import update_dependencies_dashboard
+from benchmarks.fake_github import start_fake_github
+from benchmarks.fake_pypi import start_fake_pypi
+from benchmarks.fixtures import DJANGO_VERSIONS, PYTHON_VERSIONS, create_fixture_repos
+from facts_cache import FactsCache
+from git_metadata import close_metadata_reader
+from metrics import get_metrics
+from repo_sources import GitHubRepoSource
+from source_code_links_scrapper import scrape_links
+
+TARGET_VERSIONS = {"django": DJANGO_VERSIONS, "python": PYTHON_VERSIONS}
+
+
+def timed(stages, name, function, *args):
+    started_at = time.perf_counter()
+    result = function(*args)
+    stages[name] = round(time.perf_counter() - started_at, 4)
+    return result
+
+
+def clone_all(repos):
+    return {name: main.clone_repository(repo['repo_url']) for name, repo in repos.items()}
+
+
+def release_all(repos):
+    for repo in repos.values():
+        mirror_cache.get_mirror_cache().release(repo['repo_url'])
+
+
+def list_tags(repo_dirs):
+    return {name: main.get_release_tags(repo_dir) for name, repo_dir in repo_dirs.items()}
+
+
+def probe_all(repo_dirs, release_tags):
+    first_releases = {}
+    for name, repo_dir in repo_dirs.items():
+        first_releases[name] = main.find_first_supporting_releases_of(repo_dir, release_tags[name], TARGET_VERSIONS)
+        close_metadata_reader(repo_dir)
+    return first_releases
+
+
+def probe_github_api(server, repos):
+    # Tag listing and probing of every repository through the API, (release tags, first releases)
+    release_tags, first_releases = {}, {}
+    for name in repos:
+        source = GitHubRepoSource('bench', name, api_url=server.api_url, raw_url=server.raw_url, token='bench-token')
+        release_tags[name] = main.get_release_tags(source)
+        first_releases[name] = main.find_first_supporting_releases_of(source, release_tags[name], TARGET_VERSIONS)
+    return release_tags, first_releases
+
+
+def mismatches(repos, first_releases):
+    # (package, version type, version, expected, found) of every wrong answer
+    return [
+        (name, version_type, version, expected, first_releases[name][version_type][version])
+        for name, repo in repos.items()
+        for version_type, history in repo['history'].items()
+        for version, expected in history.items()
+        if first_releases[name][version_type][version] != expected
+    ]
+
+
+def resolve_links(work_dir, fresh):
+    # scrape_links works on the current directory, fresh drops the links resolved before
+    current_dir = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        if fresh:
+            for file_name in os.listdir(work_dir):
+                if file_name.startswith('dependencies_dashboard'):
+                    os.remove(file_name)
+        return scrape_links()
+    finally:
+        os.chdir(current_dir)
+
+
+def run_benchmarks(repo_count, tag_count, seed=0, throttle_rate=0.0, slow_rate=0.0):
+    stages = {}
+    with tempfile.TemporaryDirectory(prefix='pypi-deps-bench-') as root:
+        repos = timed(stages, 'create_fixtures', create_fixture_repos, os.path.join(root, 'repos'), repo_count, tag_count, seed)
+
+        # Fresh caches under the temporary directory, the user's caches are left alone
+        mirror_cache._mirror_cache = mirror_cache.MirrorCache(os.path.join(root, 'mirrors'))
+        package_metadata._facts_cache = FactsCache(
+            os.path.join(root, 'facts.sqlite3'), extractor_version=package_metadata.FACTS_EXTRACTOR_VERSION
+        )
+        http_cache._http_cache = http_cache.HTTPCache(os.path.join(root, 'http'))
+        rate_limits._scheduler = rate_limits.RequestScheduler()
+
+        repo_dirs = timed(stages, 'clone_cold', clone_all, repos)
+        repo_dirs = timed(stages, 'clone_warm', clone_all, repos)
+        release_tags = timed(stages, 'get_release_tags', list_tags, repo_dirs)
+        first_releases = timed(stages, 'probe_cold', probe_all, repo_dirs, release_tags)
+        cold_mismatches = mismatches(repos, first_releases)
+        first_releases = timed(stages, 'probe_warm', probe_all, repo_dirs, release_tags)
+        warm_mismatches = mismatches(repos, first_releases)
+        # Both clone stages leased every mirror
+        release_all(repos)
+        release_all(repos)
+
+        facts_cache = package_metadata._facts_cache
+        package_metadata._facts_cache = FactsCache(
+            os.path.join(root, 'api-facts.sqlite3'), extractor_version=package_metadata.FACTS_EXTRACTOR_VERSION
+        )
+        github = start_fake_github({f"bench/{name}": repo['repo_url'][len('file://'):] for name, repo in repos.items()})
+        # Measures the backend rather than GitHub's rate limits
+        rate_limits.get_request_scheduler().host_limits[github.api_url.split('//')[1]] = (1000.0, 1000, 8)
+        try:
+            api_release_tags, first_releases = timed(stages, 'probe_github_api', probe_github_api, github, repos)
+        finally:
+            github.shutdown()
+        api_mismatches = mismatches(repos, first_releases) + [
+            (name, 'release_tags', None, release_tags[name], api_release_tags[name])
+            for name in repos if api_release_tags[name] != release_tags[name]
+        ]
+        package_metadata._facts_cache.close()
+        package_metadata._facts_cache = facts_cache
+
+        # Half of the packages have no source link in their JSON metadata, and
+        # half of those only have it on their version pages
+        server = start_fake_pypi({
+            name: {
+                "repo_url": f"https://github.com/bench/{name}",
+                "json_link": index % 2 == 0,
+                "sidebar": index % 4 != 3,
+                "versions": [f"1.0.{version}" for version in range(10)]
+            }
+            for index, name in enumerate(repos)
+        }, throttle_rate=throttle_rate, slow_rate=slow_rate, seed=seed)
+        pypi_scraper.PYPI_BASE_URL = server.base_url
+        update_dependencies_dashboard.GITHUB_RAW_URL = f"{server.base_url}/dashboard_main.csv"
+        links_dir = os.path.join(root, 'links')
+        os.makedirs(links_dir)
+        try:
+            timed(stages, 'scrape_links_cold', resolve_links, links_dir, True)
+            cold_requests = dict(server.stats)
+            links = timed(stages, 'scrape_links_warm', resolve_links, links_dir, True)
+            warm_requests = {key: server.stats[key] - cold_requests[key] for key in server.stats}
+        finally:
+            server.shutdown()
+
+        report = {
+            "repos": repo_count,
+            "tags": tag_count,
+            "seconds": stages,
+            "correct": not cold_mismatches and not warm_mismatches and not api_mismatches,
+            "mismatches": cold_mismatches + warm_mismatches + api_mismatches,
+            "links_resolved": sum(1 for link in links if link['source'].startswith('https://github.com/')),
+            "pypi_requests": {"cold": cold_requests, "warm": warm_requests},
+            "github_api_requests": dict(github.stats),
+            "mirror_cache": mirror_cache.get_mirror_cache().report(),
+            "facts_cache": package_metadata.get_facts_cache().report(),
+            "http_cache": http_cache.get_http_cache().report(),
+            "hosts": rate_limits.get_request_scheduler().report(),
+            "counters": get_metrics().summary()['counters']
+        }
+        package_metadata.get_facts_cache().close()
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Offline benchmark of cloning, tag probing and link resolution")
+    parser.add_argument('--repos', type=int, default=10, help="number of generated repositories")
+    parser.add_argument('--tags', type=int, default=200, help="release tags per repository")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="share of PyPI requests answered with 429")
+    parser.add_argument('--slow-rate', type=float, default=0.0, help="share of PyPI requests answered slowly")
+    parser.add_argument('--output', help="also write the report to this JSON file")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.repos, args.tags, args.seed, args.throttle_rate, args.slow_rate)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(report, output_file, indent=2)
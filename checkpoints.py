@@ -0,0 +1,167 @@
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+from constants import CHECKPOINTS_DB_PATH
+
+# Stages a dependency goes through in main.py, in order
+STAGES = ['url_resolved', 'cloned', 'tags_listed', 'probed', 'saved']
+# Skip reasons of a saved result that are worth retrying on --resume
+RETRYABLE_SKIP_REASONS = ['no_access']
+
+
+def _now():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')
+
+
+class CheckpointStore:
+    """
+    SQLite record of the stage every dependency of a run reached, and of
+    the reason it failed, so an interrupted run can be resumed.
+    """
+
+    def __init__(self, db_path=CHECKPOINTS_DB_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            " run_id TEXT PRIMARY KEY,"
+            " started_at TEXT NOT NULL,"
+            " finished_at TEXT,"
+            " dependencies TEXT NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS stages ("
+            " run_id TEXT NOT NULL,"
+            " dependency TEXT NOT NULL,"
+            " stage TEXT NOT NULL,"
+            " failed INTEGER NOT NULL DEFAULT 0,"
+            " reason TEXT,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " updated_at TEXT NOT NULL,"
+            " PRIMARY KEY (run_id, dependency));"
+        )
+        self._connection.commit()
+
+    def start_run(self, run_id, dependencies):
+        """
+        Records a new run with its resolved dependency links (the output of
+        scrape_links), which marks every dependency as url_resolved.
+        """
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO runs (run_id, started_at, dependencies) VALUES (?, ?, ?)",
+                (run_id, _now(), json.dumps(dependencies))
+            )
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO stages (run_id, dependency, stage, updated_at) VALUES (?, ?, 'url_resolved', ?)",
+                [(run_id, dependency['dependency'], _now()) for dependency in dependencies]
+            )
+
+    def finish_run(self, run_id):
+        with self._lock, self._connection:
+            self._connection.execute("UPDATE runs SET finished_at = ? WHERE run_id = ?", (_now(), run_id))
+
+    def last_unfinished_run(self):
+        # (run_id, dependencies) of the latest run that didn't finish, or None
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT run_id, dependencies FROM runs WHERE finished_at IS NULL ORDER BY started_at DESC LIMIT 1"
+            ).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    def record(self, run_id, dependency_name, stage):
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT INTO stages (run_id, dependency, stage, updated_at) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT(run_id, dependency) DO UPDATE SET"
+                " stage = excluded.stage, failed = 0, reason = NULL, updated_at = excluded.updated_at",
+                (run_id, dependency_name, stage, _now())
+            )
+
+    def fail(self, run_id, dependency_name, stage, reason):
+        # Keeps the last stage reached before the failure and why, for the next --resume
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT INTO stages (run_id, dependency, stage, failed, reason, attempts, updated_at)"
+                " VALUES (?, ?, ?, 1, ?, 1, ?)"
+                " ON CONFLICT(run_id, dependency) DO UPDATE SET"
+                " stage = excluded.stage, failed = 1, reason = excluded.reason,"
+                " attempts = attempts + 1, updated_at = excluded.updated_at",
+                (run_id, dependency_name, stage, reason, _now())
+            )
+
+    def unfinished(self, run_id):
+        # Names of the dependencies of a run that were not saved yet
+        with self._lock:
+            return {
+                row[0] for row in self._connection.execute(
+                    "SELECT dependency FROM stages WHERE run_id = ? AND (stage != 'saved' OR failed = 1)",
+                    (run_id,)
+                )
+            }
+
+    def failures(self, run_id):
+        # {dependency: (stage, reason, failed attempts)} of the failed dependencies of a run
+        with self._lock:
+            return {
+                dependency: (stage, reason, attempts)
+                for dependency, stage, reason, attempts in self._connection.execute(
+                    "SELECT dependency, stage, reason, attempts FROM stages WHERE run_id = ? AND failed = 1",
+                    (run_id,)
+                )
+            }
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+class CheckpointedAnalyzer:
+    """
+    Wraps the analyze/save pair of the pipeline to record the stage each
+    dependency reaches in a CheckpointStore.
+
+    analyze: callable taking a dependency dict and an on_stage callback
+    save: callable persisting one results dict
+    """
+
+    def __init__(self, analyze, save, store, run_id):
+        self._analyze = analyze
+        self._save = save
+        self.store = store
+        self.run_id = run_id
+
+    def analyze(self, dependency):
+        dependency_name = dependency['dependency']
+        current_stage = ['url_resolved']
+
+        def on_stage(stage):
+            current_stage[0] = stage
+            self.store.record(self.run_id, dependency_name, stage)
+
+        try:
+            results = self._analyze(dependency, on_stage=on_stage)
+        except Exception as ex:
+            self.store.fail(self.run_id, dependency_name, current_stage[0], f"{type(ex).__name__}: {ex}")
+            raise
+        if results is None:
+            # Nothing to save, e.g. unchanged upstream in incremental mode
+            self.store.record(self.run_id, dependency_name, 'saved')
+        return results
+
+    def save(self, results):
+        try:
+            self._save(results)
+        except Exception as ex:
+            # Probed but not saved, --resume retries it
+            for dependency_name in results:
+                self.store.fail(self.run_id, dependency_name, 'probed', f"{type(ex).__name__}: {ex}")
+            raise
+        for dependency_name, result in results.items():
+            if result.get('skipped') and result.get('reason') in RETRYABLE_SKIP_REASONS:
+                # The clone never succeeded, url_resolved is the last stage reached
+                self.store.fail(self.run_id, dependency_name, 'url_resolved', result['reason'])
+            else:
+                self.store.record(self.run_id, dependency_name, 'saved')
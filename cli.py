@@ -0,0 +1,50 @@
+"""
+Single entry point of the tools:
+
+    python cli.py resolve-links [--shard i/N]
+    python cli.py probe [--workers N] [--incremental] ...
+    python cli.py report [--formats csv,html] ...
+    python cli.py query {compact,show,first-release,lacking} ...
+
+Only the module of the chosen subcommand is imported, so `query` and
+`--help` start without loading requests, bs4 or pandas. Every module
+keeps its own `python <module>.py` entry point, built from the same
+add_arguments and run functions.
+"""
+import argparse
+import importlib
+import sys
+
+# Subcommand: (module with add_arguments(parser) and run(args), help)
+SUBCOMMANDS = {
+    'resolve-links': ('source_code_links_scrapper', "resolve the source code links of the dashboard dependencies"),
+    'probe': ('main', "find the first releases of dependencies supporting new Django/Python versions"),
+    'report': ('compatibility_report', "build the Django/Python compatibility matrix report"),
+    'query': ('results_store', "query and maintain the results store"),
+}
+
+
+def build_parser(command=None):
+    # Parser with every subcommand listed, only `command` gets its arguments (and its module imported)
+    parser = argparse.ArgumentParser(
+        prog='cli.py', description="Track the support of dependencies for new Django/Python versions"
+    )
+    subparsers = parser.add_subparsers(dest='subcommand', required=True, metavar='{' + ','.join(SUBCOMMANDS) + '}')
+    for name, (module_name, help_text) in SUBCOMMANDS.items():
+        subparser = subparsers.add_parser(name, help=help_text, description=help_text)
+        if name == command:
+            importlib.import_module(module_name).add_arguments(subparser)
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    command = next((arg for arg in argv if not arg.startswith('-')), None)
+    if command not in SUBCOMMANDS:
+        command = None
+    args = build_parser(command).parse_args(argv)
+    importlib.import_module(SUBCOMMANDS[args.subcommand][0]).run(args)
+
+
+if __name__ == '__main__':
+    main()
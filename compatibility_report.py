@@ -0,0 +1,294 @@
+"""
+Compatibility matrix of the dependencies against the target Django and
+Python versions, built from the results store.
+
+Results are flattened into a table of (dependency, version type, version,
+first release) rows and every aggregate is computed column-wise with
+pandas: the share of dependencies ready for each version and the
+dependencies blocking an upgrade. The flattened tables are cached next to
+the outputs, so a rebuild only parses the results saved since.
+
+Usage:
+    python compatibility_report.py
+    python compatibility_report.py --formats csv,html,parquet --output-dir reports
+"""
+import argparse
+import html
+import importlib.util
+import os
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+from packaging.version import InvalidVersion, Version
+
+from constants import DJANGO_TARGET_VERSIONS, PYTHON_TARGET_VERSIONS, RESULTS_DB_PATH
+from results_store import VERSION_TYPES, open_results_store
+
+REPORT_DIR = "reports"
+CACHE_FILE = "compatibility_tables.pkl"
+# Bump whenever flatten_results changes, to drop cached tables
+CACHE_VERSION = 1
+FORMATS = ['csv', 'html', 'parquet']
+
+RELEASE, DEFAULT_BRANCH, MISSING = 'release', 'default_branch', 'missing'
+STATUSES = [RELEASE, DEFAULT_BRANCH, MISSING]
+# Results saved before default_branch was recorded only tell these names apart from tags
+DEFAULT_BRANCH_NAMES = ['main', 'master', 'develop', 'development', 'trunk', 'No Default Branch']
+
+DEPENDENCY_COLUMNS = ['dependency', 'saved_at', 'skipped', 'reason', 'is_django', 'default_branch']
+SUPPORT_COLUMNS = ['dependency', 'version_type', 'version', 'release']
+
+
+def flatten_results(entries):
+    """
+    entries: (dependency, result, saved_at) tuples, see ResultsStore.latest_entries
+    Returns (dependencies, support): one row per dependency, and one row per
+    (dependency, version type, version) with its first supporting release.
+    """
+    dependency_rows, support_rows = [], []
+    for dependency_name, result, saved_at in entries:
+        dependency_rows.append((
+            dependency_name, saved_at, bool(result.get('skipped')), result.get('reason'),
+            result.get('is_django'), result.get('default_branch')
+        ))
+        for version_type in VERSION_TYPES:
+            for version, release in (result.get(version_type) or {}).items():
+                support_rows.append((dependency_name, version_type, version, release))
+    return (
+        pd.DataFrame(dependency_rows, columns=DEPENDENCY_COLUMNS),
+        pd.DataFrame(support_rows, columns=SUPPORT_COLUMNS)
+    )
+
+
+def load_tables(results_store, cache_path=None, full=False):
+    """
+    Flattened tables of the latest results (see flatten_results), updated
+    from the cached ones at cache_path: only the results saved since the
+    cache was written are read and parsed, results no longer in the store
+    are dropped. full ignores the cache.
+    Returns (dependencies, support, number of dependencies parsed).
+    """
+    saved_times = results_store.saved_times()
+    cached = None
+    if cache_path and not full and os.path.exists(cache_path):
+        cached = pd.read_pickle(cache_path)
+        if cached.get('version') != CACHE_VERSION:
+            cached = None
+
+    if cached is None:
+        dependencies, support = flatten_results(results_store.latest_entries())
+        parsed = len(dependencies)
+    else:
+        dependencies, support = cached['dependencies'], cached['support']
+        cached_times = pd.Series(dependencies['saved_at'].values, index=dependencies['dependency'])
+        current_times = pd.Series(saved_times, dtype=object)
+        changed = current_times.index[~current_times.eq(cached_times.reindex(current_times.index))]
+        stale = set(changed) | set(cached_times.index.difference(current_times.index))
+        new_dependencies, new_support = flatten_results(results_store.entries_of(changed))
+        dependencies = pd.concat(
+            [dependencies[~dependencies['dependency'].isin(stale)], new_dependencies], ignore_index=True
+        )
+        support = pd.concat([support[~support['dependency'].isin(stale)], new_support], ignore_index=True)
+        parsed = len(changed)
+
+    if cache_path:
+        os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+        pd.to_pickle({"version": CACHE_VERSION, "dependencies": dependencies, "support": support}, cache_path)
+    return dependencies, support, parsed
+
+
+def _version_key(version):
+    try:
+        return Version(version)
+    except InvalidVersion:
+        return Version('0')
+
+
+def support_matrix(dependencies, support, target_versions=None):
+    """
+    Support rows of the target versions (all versions when None) with the
+    status of each: released, only on the default branch, or missing.
+    target_versions: dict mapping django/python to lists of versions
+    """
+    frame = support
+    if target_versions is not None:
+        targeted = np.zeros(len(frame), dtype=bool)
+        for version_type, versions in target_versions.items():
+            targeted |= (frame['version_type'] == version_type).to_numpy() & frame['version'].isin(versions).to_numpy()
+        frame = frame[targeted]
+    frame = frame.merge(dependencies[['dependency', 'default_branch']], on='dependency', how='left')
+    release = frame['release']
+    on_default_branch = release.notna() & (
+        release.eq(frame['default_branch'])
+        | (frame['default_branch'].isna() & release.isin(DEFAULT_BRANCH_NAMES))
+    )
+    frame['status'] = np.select([release.isna(), on_default_branch], [MISSING, DEFAULT_BRANCH], RELEASE)
+    frame['target'] = frame['version_type'].str.capitalize() + ' ' + frame['version']
+    return frame
+
+
+def ordered_targets(frame):
+    # Targets in version type order, then version order
+    targets = frame[['version_type', 'version', 'target']].drop_duplicates()
+    return [
+        target for _, _, target in sorted(
+            targets.itertuples(index=False),
+            key=lambda row: (VERSION_TYPES.index(row[0]) if row[0] in VERSION_TYPES else len(VERSION_TYPES), _version_key(row[1]))
+        )
+    ]
+
+
+def summarize(frame):
+    """
+    One row per target version: dependencies with a supporting release,
+    with support only on their default branch and without support, and the
+    percentage ready (released support) among the dependencies probed for it.
+    """
+    counts = pd.crosstab(frame['target'], frame['status']).reindex(columns=STATUSES, fill_value=0)
+    counts = counts.reindex(ordered_targets(frame))
+    counts['dependencies'] = counts[STATUSES].sum(axis=1)
+    counts['percent_ready'] = (100 * counts[RELEASE] / counts['dependencies']).round(1)
+    counts['percent_ready_or_unreleased'] = (
+        100 * (counts[RELEASE] + counts[DEFAULT_BRANCH]) / counts['dependencies']
+    ).round(1)
+    return counts.rename_axis(index='target', columns=None).reset_index()
+
+
+def blockers(frame):
+    # Dependencies without a supporting release, per target version
+    blocking = frame[frame['status'] != RELEASE]
+    blocking = blocking.assign(target=pd.Categorical(blocking['target'], ordered_targets(frame), ordered=True))
+    return blocking.sort_values(['target', 'status', 'dependency'])[['target', 'dependency', 'status', 'release']]
+
+
+def top_blockers(frame, count=20):
+    # Dependencies blocking the most target versions
+    blocking = frame[frame['status'] != RELEASE]
+    per_dependency = blocking.groupby('dependency')['target'].agg(blocked_targets='size', targets=', '.join)
+    return per_dependency.sort_values('blocked_targets', ascending=False, kind='stable').head(count).reset_index()
+
+
+def wide_matrix(frame):
+    # Dependency x target version table of first releases, 'default branch: <name>' or empty
+    cells = np.where(
+        frame['status'] == MISSING, '',
+        np.where(frame['status'] == DEFAULT_BRANCH, 'default branch: ' + frame['release'].fillna(''), frame['release'])
+    )
+    matrix = frame.assign(cell=cells).pivot(index='dependency', columns='target', values='cell')
+    return matrix.reindex(columns=ordered_targets(frame)).fillna('').sort_index()
+
+
+def html_table(frame, index=True):
+    """
+    HTML table of frame, built column-wise: DataFrame.to_html formats cell
+    by cell and takes seconds for a matrix of tens of thousands of rows.
+    """
+    if index:
+        frame = frame.reset_index()
+    cells = frame.astype(str).apply(lambda column: column.map(html.escape))
+    header = ''.join(f"<th>{html.escape(str(column))}</th>" for column in frame.columns)
+    if not len(frame):
+        return f"<table border='1'><thead><tr>{header}</tr></thead><tbody></tbody></table>"
+    rows = reduce(lambda row, column: row + '<td>' + cells[column] + '</td>', cells.columns, pd.Series('<tr>', index=cells.index))
+    return f"<table border='1'><thead><tr>{header}</tr></thead><tbody>" + (rows + '</tr>').str.cat(sep='\n') + "</tbody></table>"
+
+
+def parquet_available():
+    return any(importlib.util.find_spec(engine) for engine in ['pyarrow', 'fastparquet'])
+
+
+def write_report(dependencies, frame, output_dir=REPORT_DIR, formats=None):
+    """
+    Writes the matrix, summary and blockers to output_dir in the given
+    formats (csv, html, parquet). Parquet needs pyarrow or fastparquet and
+    is skipped with a message without them. Returns the written paths.
+    """
+    formats = formats or ['csv', 'html']
+    os.makedirs(output_dir, exist_ok=True)
+    summary, blocking, top, matrix = summarize(frame), blockers(frame), top_blockers(frame), wide_matrix(frame)
+    skipped = dependencies[dependencies['skipped']]
+    written = []
+
+    def path(file_name):
+        written.append(os.path.join(output_dir, file_name))
+        return written[-1]
+
+    if 'csv' in formats:
+        matrix.to_csv(path('compatibility_matrix.csv'))
+        summary.to_csv(path('compatibility_summary.csv'), index=False)
+        blocking.to_csv(path('compatibility_blockers.csv'), index=False)
+    if 'html' in formats:
+        with open(path('compatibility_report.html'), 'w') as html_file:
+            html_file.write("<html><head><meta charset='utf-8'><title>Compatibility report</title></head><body>\n")
+            html_file.write(f"<h1>Compatibility report</h1>\n<p>{len(dependencies)} dependencies, "
+                            f"{len(skipped)} skipped (no access or no release tags)</p>\n")
+            html_file.write("<h2>Readiness per version</h2>\n" + html_table(summary, index=False) + "\n")
+            html_file.write("<h2>Top blockers</h2>\n" + html_table(top, index=False) + "\n")
+            html_file.write("<h2>First supporting releases</h2>\n" + html_table(matrix) + "\n")
+            html_file.write("</body></html>\n")
+    if 'parquet' in formats:
+        if parquet_available():
+            frame.drop(columns=['target']).to_parquet(path('compatibility_support.parquet'), index=False)
+            dependencies.to_parquet(path('compatibility_dependencies.parquet'), index=False)
+        else:
+            print("Skipping Parquet output, it needs pyarrow or fastparquet")
+    return written
+
+
+def build_report(updates_file_path="updates.json", db_path=RESULTS_DB_PATH, output_dir=REPORT_DIR,
+                 formats=None, target_versions=None, full=False):
+    """
+    Loads the latest results (incrementally, see load_tables), writes the
+    report and returns its summary table.
+    target_versions: dict mapping django/python to the versions to report,
+        the target versions of constants.py by default
+    """
+    target_versions = target_versions or {"django": DJANGO_TARGET_VERSIONS, "python": PYTHON_TARGET_VERSIONS}
+    results_store = open_results_store(updates_file_path, db_path)
+    try:
+        dependencies, support, parsed = load_tables(results_store, os.path.join(output_dir, CACHE_FILE), full)
+    finally:
+        results_store.close()
+    print(f"Parsed {parsed} of {len(dependencies)} results")
+    frame = support_matrix(dependencies, support, target_versions)
+    for written_path in write_report(dependencies, frame, output_dir, formats):
+        print(f"Wrote {written_path}")
+    return summarize(frame)
+
+
+def formats_argument(text):
+    formats = [output_format.strip() for output_format in text.split(',') if output_format.strip()]
+    unknown_formats = set(formats) - set(FORMATS)
+    if unknown_formats:
+        raise argparse.ArgumentTypeError(f"unknown formats: {sorted(unknown_formats)}")
+    return formats
+
+
+def add_arguments(parser):
+    parser.add_argument('--updates-file', default="updates.json")
+    parser.add_argument('--output-dir', default=REPORT_DIR)
+    parser.add_argument(
+        '--formats', type=formats_argument, default='csv,html', help=f"comma separated, out of {','.join(FORMATS)}"
+    )
+    parser.add_argument('--django-versions', help="comma separated, defaults to DJANGO_TARGET_VERSIONS")
+    parser.add_argument('--python-versions', help="comma separated, defaults to PYTHON_TARGET_VERSIONS")
+    parser.add_argument('--full', action='store_true', help="rebuild from every result instead of the changed ones")
+
+
+def run(args):
+    report_target_versions = {
+        "django": args.django_versions.split(',') if args.django_versions else DJANGO_TARGET_VERSIONS,
+        "python": args.python_versions.split(',') if args.python_versions else PYTHON_TARGET_VERSIONS
+    }
+    report_summary = build_report(
+        args.updates_file, output_dir=args.output_dir, formats=args.formats,
+        target_versions=report_target_versions, full=args.full
+    )
+    print(report_summary.to_string(index=False))
+
+
+if __name__ == '__main__':
+    main_parser = argparse.ArgumentParser(description="Build the Django/Python compatibility matrix report from the results store")
+    add_arguments(main_parser)
+    run(main_parser.parse_args())
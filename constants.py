@@ -1 +1,65 @@
+import os
+
 GITHUB_ACCESS_TOKEN = "PLACE GITHUB TOKEN HERE"
+
+# Persistent cache of bare partial clones, shared across runs
+MIRROR_CACHE_DIR = os.path.expanduser("~/.cache/pypi-dependencies-updates/mirrors")
+# Disk budget of the mirrors, least recently used ones are evicted above it
+MIRROR_CACHE_MAX_BYTES = 20 * 1024 ** 3
+
+# Overridable to run against a local stand-in, see benchmarks/fake_pypi.py
+PYPI_BASE_URL = os.environ.get("PYPI_BASE_URL", "https://pypi.org")
+
+# On-disk cache of HTTP responses revalidated with ETag/Last-Modified
+HTTP_CACHE_DIR = os.path.expanduser("~/.cache/pypi-dependencies-updates/http")
+HTTP_CACHE_MAX_BYTES = 1024 ** 3
+
+# Facts extracted from packaging files, keyed by git blob id
+FACTS_CACHE_PATH = os.path.expanduser("~/.cache/pypi-dependencies-updates/facts.sqlite3")
+
+# Per-(repository, ref) support declared by packaging files, see support_table.py
+SUPPORT_TABLE_PATH = os.path.expanduser("~/.cache/pypi-dependencies-updates/support.sqlite3")
+
+# Versions the first supporting release is looked for, overridable with
+# --django-versions/--python-versions; the Django ones only for Django packages
+DJANGO_TARGET_VERSIONS = ['4.0', '4.1', '4.2']
+PYTHON_TARGET_VERSIONS = ['3.11', '3.10', '3.9']
+
+# Store of resolved source code links, exported to dependencies_dashboard.csv
+LINKS_DB_PATH = "dependencies_dashboard.sqlite3"
+
+# Queryable store of analysis results, updates.json is exported from it
+RESULTS_DB_PATH = "updates.sqlite3"
+
+# Per-run record of the stage each dependency reached, used by --resume
+CHECKPOINTS_DB_PATH = "checkpoints.sqlite3"
+
+# Release tag preprocessing: keep alpha/beta/rc/dev tags, and what to do when
+# no tag of a repository parses as a version ('drop', or 'fallback' to all tags)
+INCLUDE_PRERELEASE_TAGS = False
+UNPARSABLE_TAGS = 'fallback'
+
+# Per-host request limits: (requests per second, burst, max concurrent requests)
+DEFAULT_HOST_RATE = 10.0
+DEFAULT_HOST_BURST = 20
+DEFAULT_HOST_CONCURRENCY = 8
+HOST_RATE_LIMITS = {
+    "pypi.org": (20.0, 40, 16),
+    "github.com": (5.0, 10, 8),
+    "api.github.com": (5.0, 10, 8),
+    "raw.githubusercontent.com": (10.0, 20, 8),
+}
+# Attempts of a request or clone failing with a throttling or transient error
+MAX_REQUEST_ATTEMPTS = 5
+
+# Delete each mirror once every package of its repository was analyzed,
+# for runners with small ephemeral disks
+MIRROR_CACHE_EPHEMERAL = False
+
+# Where tags and packaging files are read from: 'git' clones every repository,
+# 'github-api' reads GitHub-hosted ones through the REST/GraphQL APIs and raw
+# file URLs without cloning, 'auto' does so only when GITHUB_ACCESS_TOKEN is set
+REPO_SOURCE_BACKEND = 'git'
+# Overridable to run against a local stand-in, see benchmarks/fake_github.py
+GITHUB_API_URL = os.environ.get("GITHUB_API_URL", "https://api.github.com")
+GITHUB_RAW_CONTENT_URL = os.environ.get("GITHUB_RAW_CONTENT_URL", "https://raw.githubusercontent.com")
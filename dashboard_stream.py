@@ -0,0 +1,81 @@
+import ast
+import csv
+import re
+import sys
+from functools import lru_cache
+
+# Requirement cells of the repo-health dashboard can be very long
+csv.field_size_limit(sys.maxsize)
+
+REQUIREMENT_NAME_RE = re.compile(r"^\s*([A-Za-z0-9](?:[A-Za-z0-9._-]*[A-Za-z0-9])?)")
+# A list literal made only of plain quoted strings, the shape of every dashboard cell
+STRING_LIST_RE = re.compile(r"""\[\s*(?:(?:'[^'\\]*'|"[^"\\]*")\s*(?:,\s*|(?=\])))*\]""")
+QUOTED_STRING_RE = re.compile(r"""'([^'\\]*)'|"([^"\\]*)\"""")
+
+
+@lru_cache(maxsize=8192)
+def normalize_name(name):
+    # PEP 503 normalized form of a project name
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def parse_requirement_name(requirement):
+    """
+    Returns the normalized project name of a requirement string such as
+    `edx-opaque-keys[django]==2.5.0`, or None if it has no valid name.
+    """
+    match = REQUIREMENT_NAME_RE.match(requirement)
+    return normalize_name(match.group(1)) if match else None
+
+
+def parse_string_list(cell):
+    """
+    Parses a list literal of strings without evaluating it. Plain string
+    lists are matched with a regular expression; anything else goes through
+    ast.literal_eval. Returns None for malformed cells.
+    """
+    if STRING_LIST_RE.fullmatch(cell.strip()):
+        return [single or double for single, double in QUOTED_STRING_RE.findall(cell)]
+    try:
+        values = ast.literal_eval(cell)
+    except (ValueError, SyntaxError):
+        return None
+    if isinstance(values, (list, tuple, set)):
+        return [value for value in values if isinstance(value, str)]
+    return None
+
+
+def iter_dependency_lists(csv_path, column_name):
+    """
+    Yields the list of requirement strings stored in column_name of every
+    row, reading the CSV one row at a time. Cells are parsed as Python
+    literals without evaluating them; empty and malformed cells are skipped.
+    """
+    with open(csv_path, 'r', newline='', encoding='utf-8') as csv_file:
+        csv_reader = csv.reader(csv_file)
+        header = next(csv_reader, None)
+        if not header or column_name not in header:
+            print(f"Column {column_name} not found in {csv_path}")
+            return
+        column_index = header.index(column_name)
+        for row in csv_reader:
+            if column_index >= len(row) or not row[column_index]:
+                continue
+            dependencies = parse_string_list(row[column_index])
+            if dependencies is not None:
+                yield dependencies
+
+
+def iter_dashboard_dependencies(csv_path, column_name, exclude=('django',)):
+    """
+    Yields every unique, PEP 503 normalized dependency name of the
+    dashboard as soon as it is first seen, so downstream stages can start
+    before the whole file is read. Names in exclude are skipped.
+    """
+    seen = {normalize_name(name) for name in exclude}
+    for dependencies in iter_dependency_lists(csv_path, column_name):
+        for requirement in dependencies:
+            name = parse_requirement_name(requirement)
+            if name and name not in seen:
+                seen.add(name)
+                yield name
@@ -0,0 +1,79 @@
+import json
+import os
+import sqlite3
+import threading
+
+from constants import FACTS_CACHE_PATH
+from metrics import get_metrics
+
+
+class FactsCache:
+    """
+    Persistent, content-addressed cache of the facts extracted from
+    packaging files. Entries are keyed by the git blob id of the file, so a
+    file shared by many tags (or by forks of a repository) is parsed once
+    across repositories and runs.
+
+    extractor_version: bumped whenever the extraction logic changes, so facts
+        extracted by an older version are not reused
+    """
+
+    def __init__(self, db_path=FACTS_CACHE_PATH, extractor_version=1):
+        self.db_path = db_path
+        self.extractor_version = extractor_version
+        self.stats = {"hits": 0, "misses": 0}
+        self._memory = {}
+        self._lock = threading.Lock()
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS facts ("
+            " blob_id TEXT NOT NULL,"
+            " file_name TEXT NOT NULL,"
+            " extractor_version INTEGER NOT NULL,"
+            " facts TEXT NOT NULL,"
+            " PRIMARY KEY (blob_id, file_name, extractor_version))"
+        )
+        self._connection.commit()
+
+    def get(self, blob_id, file_name):
+        # Cached facts of the blob, or None
+        key = (blob_id, file_name)
+        with self._lock:
+            facts = self._memory.get(key)
+            if facts is None:
+                row = self._connection.execute(
+                    "SELECT facts FROM facts WHERE blob_id = ? AND file_name = ? AND extractor_version = ?",
+                    (blob_id, file_name, self.extractor_version)
+                ).fetchone()
+                if row:
+                    facts = self._memory[key] = json.loads(row[0])
+            self.stats['hits' if facts is not None else 'misses'] += 1
+        get_metrics().increment('facts_cache_hits' if facts is not None else 'facts_cache_misses')
+        return facts
+
+    def put(self, blob_id, file_name, facts):
+        with self._lock:
+            self._memory[(blob_id, file_name)] = facts
+            self._connection.execute(
+                "INSERT OR REPLACE INTO facts (blob_id, file_name, extractor_version, facts) VALUES (?, ?, ?, ?)",
+                (blob_id, file_name, self.extractor_version, json.dumps(facts))
+            )
+            self._connection.commit()
+
+    def hit_rate(self):
+        lookups = self.stats['hits'] + self.stats['misses']
+        return self.stats['hits'] / lookups if lookups else 0.0
+
+    def report(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats['hit_rate'] = round(self.hit_rate(), 4)
+        return stats
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+import subprocess
+import threading
+from datetime import datetime
+
+from metrics import get_metrics
+from mirror_cache import get_mirror_cache
+from source_urls import split_repo_url
+
+FINGERPRINTS_FILE = "fingerprints.json"
+
+
+def get_remote_fingerprint(repo_url):
+    """
+    Cheap fingerprint of a remote repository: a hash of its tags and of the
+    commit its default branch points at, taken with a single `git ls-remote`
+    and without cloning anything. Returns None if the remote can't be read.
+    """
+    get_metrics().increment('git_subprocesses')
+    try:
+        with get_metrics().span('ls_remote'):
+            refs = subprocess.check_output(
+                ['git', 'ls-remote', '--symref', repo_url, 'HEAD', 'refs/tags/*'],
+                text=True, stderr=subprocess.DEVNULL, timeout=120
+            )
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+        print(f"Error reading remote refs of {repo_url}: {e}")
+        return None
+    return hashlib.sha1('\n'.join(sorted(refs.strip().splitlines())).encode('utf-8')).hexdigest()
+
+
+_run_fingerprints = {}
+_run_fingerprints_lock = threading.Lock()
+
+
+def get_run_fingerprint(repo_url):
+    # get_remote_fingerprint taken once per run, shared by the packages of a repository
+    with _run_fingerprints_lock:
+        if repo_url in _run_fingerprints:
+            return _run_fingerprints[repo_url]
+    fingerprint = get_remote_fingerprint(repo_url)
+    with _run_fingerprints_lock:
+        _run_fingerprints[repo_url] = fingerprint
+    return fingerprint
+
+
+class FingerprintStore:
+    """
+    Remote fingerprints recorded when each dependency was last analyzed,
+    kept in a JSON file next to updates.json.
+    """
+
+    def __init__(self, file_path=FINGERPRINTS_FILE):
+        self.file_path = file_path
+        self._lock = threading.Lock()
+        try:
+            with open(file_path, 'r') as fingerprints_file:
+                self._fingerprints = json.load(fingerprints_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._fingerprints = {}
+
+    def get(self, dependency_name):
+        with self._lock:
+            return self._fingerprints.get(dependency_name, {}).get('fingerprint')
+
+    def record(self, dependency_name, repo_url, fingerprint):
+        with self._lock:
+            self._fingerprints[dependency_name] = {
+                "repo_url": repo_url,
+                "fingerprint": fingerprint,
+                "updated_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')
+            }
+            temp_path = self.file_path + '.tmp'
+            with open(temp_path, 'w') as fingerprints_file:
+                json.dump(self._fingerprints, fingerprints_file, indent=2)
+            os.replace(temp_path, self.file_path)
+
+
+class IncrementalAnalyzer:
+    """
+    Wraps the analyze/save pair of the pipeline so that only dependencies
+    whose remote fingerprint changed since their last saved result are
+    cloned and probed again.
+
+    analyze: callable taking a dependency dict and returning its results
+    save: callable persisting one results dict
+    analyzed_dependencies: names having a saved result from an earlier run
+    """
+
+    def __init__(self, analyze, save, analyzed_dependencies, store=None):
+        self._analyze = analyze
+        self._save = save
+        self.analyzed_dependencies = set(analyzed_dependencies)
+        self.store = store or FingerprintStore()
+        self.skipped = 0
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def _remote_fingerprint(self, source):
+        # One ls-remote per repository, shared by the packages living in it
+        return get_run_fingerprint(split_repo_url(source)[0])
+
+    def analyze(self, dependency, **analyze_options):
+        dependency_name = dependency['dependency']
+        fingerprint = self._remote_fingerprint(dependency['source'])
+        if (
+            fingerprint
+            and dependency_name in self.analyzed_dependencies
+            and fingerprint == self.store.get(dependency_name)
+        ):
+            print(f"No upstream changes for {dependency_name}, skipping")
+            get_mirror_cache().done(split_repo_url(dependency['source'])[0])
+            with self._lock:
+                self.skipped += 1
+            return None
+        results = self._analyze(dependency, **analyze_options)
+        if fingerprint:
+            with self._lock:
+                self._pending[dependency_name] = (dependency['source'], fingerprint)
+        return results
+
+    def save(self, results):
+        # The fingerprint is recorded only once the results are saved
+        self._save(results)
+        for dependency_name in results:
+            with self._lock:
+                pending = self._pending.pop(dependency_name, None)
+            if pending:
+                self.store.record(dependency_name, *pending)
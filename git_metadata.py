@@ -0,0 +1,173 @@
+import subprocess
+import threading
+
+from metrics import get_metrics
+
+PACKAGING_FILES = ['setup.py', 'setup.cfg', 'pyproject.toml']
+
+
+class GitMetadataReader:
+    """
+    Reads files straight from the git object database of a repository, so a
+    tag can be probed without checking it out.
+
+    A single `git cat-file --batch` process is kept alive per repository and
+    every lookup is written to its stdin, which avoids a fork/exec per file.
+    Blob ids are resolved by a second `git cat-file --batch-check` process,
+    which only needs trees and so doesn't download blobs of partial clones.
+    """
+
+    def __init__(self, repo_dir):
+        self.repo_dir = repo_dir
+        self._process = None
+        self._check_process = None
+        self._lock = threading.Lock()
+
+    def _spawn(self, process, batch_option):
+        if process is None or process.poll() is not None:
+            get_metrics().increment('git_subprocesses')
+            process = subprocess.Popen(
+                ['git', 'cat-file', batch_option],
+                cwd=self.repo_dir,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL
+            )
+        return process
+
+    def _start(self):
+        self._process = self._spawn(self._process, '--batch')
+        return self._process
+
+    def read_blob_ids(self, ref, paths):
+        """
+        Returns a dict mapping each of paths to the id of its blob at ref, or
+        to None if it doesn't exist at ref.
+        """
+        blob_ids = {}
+        with self._lock:
+            self._check_process = self._spawn(self._check_process, '--batch-check=%(objectname)')
+            process = self._check_process
+            try:
+                for path in paths:
+                    process.stdin.write(f"{ref}:{path}\n".encode('utf-8'))
+                process.stdin.flush()
+                for path in paths:
+                    output = process.stdout.readline().decode('utf-8').split()
+                    # "<object> missing" or "<object> ambiguous" when not found
+                    blob_ids[path] = output[0] if len(output) == 1 else None
+            except BrokenPipeError as e:
+                print(f"Error resolving files at {ref} in {self.repo_dir}: {e}")
+                self._close()
+                return {path: None for path in paths}
+        return blob_ids
+
+    def read_file(self, ref, path):
+        """
+        ref: tag, branch or commit to read from
+        path: file path relative to the repository root
+        Returns the file content as text, or None if it doesn't exist at ref.
+        """
+        return self.read_object(f"{ref}:{path}")
+
+    def read_object(self, object_name):
+        """
+        object_name: blob id, or <ref>:<path>
+        Returns the blob content as text, or None if there is no such blob.
+        """
+        with self._lock:
+            process = self._start()
+            try:
+                process.stdin.write(f"{object_name}\n".encode('utf-8'))
+                process.stdin.flush()
+                header = process.stdout.readline().decode('utf-8').split()
+                if len(header) != 3:
+                    # "<object> missing" or "<object> ambiguous"
+                    return None
+                _, object_type, size = header
+                content = process.stdout.read(int(size))
+                process.stdout.read(1)  # trailing newline after the content
+            except (BrokenPipeError, ValueError) as e:
+                print(f"Error reading {object_name} in {self.repo_dir}: {e}")
+                self._close()
+                return None
+        if object_type != 'blob':
+            return None
+        return content.decode('utf-8', errors='replace')
+
+    def read_packaging_files(self, ref):
+        """
+        Returns a dict mapping setup.py, setup.cfg and pyproject.toml to their
+        content at ref, or None for the files that don't exist.
+        """
+        return {file_name: self.read_file(ref, file_name) for file_name in PACKAGING_FILES}
+
+    def _close(self):
+        for process in [self._process, self._check_process]:
+            if process is not None:
+                if process.stdin:
+                    process.stdin.close()
+                process.wait()
+        self._process = None
+        self._check_process = None
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+
+def get_latest_release_tag(repo_dir):
+    try:
+        # Run the Git command to get the latest tag on the specified branch
+        get_metrics().increment('git_subprocesses')
+        return subprocess.check_output(["git", "describe", "--tags", "--abbrev=0", get_default_branch(repo_dir)], cwd=repo_dir, text=True).strip()
+    
+    except subprocess.CalledProcessError as e:
+        # Handle errors, e.g., when there are no tags on the specified branch
+        print(f"Error: {e}")
+        return None
+
+
+def get_default_branch(repo_dir):
+    # Get the symbolic reference for the remote's HEAD, bare mirrors only
+    # have their own HEAD pointing at the default branch
+    get_metrics().increment('git_subprocesses')
+    try:
+        default_branch_ref = subprocess.check_output(
+            ['git', 'symbolic-ref', 'refs/remotes/origin/HEAD'],
+            cwd=repo_dir, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except subprocess.CalledProcessError:
+        default_branch_ref = None
+    try:
+        if not default_branch_ref:
+            get_metrics().increment('git_subprocesses')
+            default_branch_ref = subprocess.check_output(
+                ['git', 'symbolic-ref', 'HEAD'],
+                cwd=repo_dir, text=True
+            ).strip()
+        # Extract the branch name
+        default_branch = default_branch_ref.split('/')[-1]
+        return default_branch
+    except subprocess.CalledProcessError as e:
+        print(f"Error: {e}")
+        return "No Default Branch"
+
+
+_readers = {}
+_readers_lock = threading.Lock()
+
+
+def get_metadata_reader(repo_dir):
+    # One long-lived reader per repository
+    with _readers_lock:
+        if repo_dir not in _readers:
+            _readers[repo_dir] = GitMetadataReader(repo_dir)
+        return _readers[repo_dir]
+
+
+def close_metadata_reader(repo_dir):
+    with _readers_lock:
+        reader = _readers.pop(repo_dir, None)
+    if reader:
+        reader.close()
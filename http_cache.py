@@ -0,0 +1,173 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import requests
+
+from constants import HTTP_CACHE_DIR, HTTP_CACHE_MAX_BYTES
+from metrics import get_metrics
+from rate_limits import get_request_scheduler
+
+REQUEST_TIMEOUT = 30
+
+
+class HTTPCache:
+    """
+    On-disk cache of HTTP GET responses.
+
+    The ETag/Last-Modified validators of a response are stored next to its
+    body and sent back as If-None-Match/If-Modified-Since; a 304 answer is
+    served from disk. The least recently used entries are evicted once the
+    cache grows over max_bytes.
+    """
+
+    def __init__(self, cache_dir=HTTP_CACHE_DIR, max_bytes=HTTP_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "bytes_fetched": 0, "bytes_served_from_cache": 0}
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._total_size = sum(size for _, _, size in self._entries())
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, key + '.body'), os.path.join(self.cache_dir, key + '.json')
+
+    def _entries(self):
+        # (body path, last used time, size) of every cached response
+        for file_name in os.listdir(self.cache_dir):
+            if file_name.endswith('.body'):
+                path = os.path.join(self.cache_dir, file_name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, stat.st_mtime, stat.st_size
+
+    def _load_meta(self, meta_path):
+        try:
+            with open(meta_path, 'r') as meta_file:
+                return json.load(meta_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def fetch(self, url, session=None, headers=None, timeout=REQUEST_TIMEOUT):
+        """
+        GETs url, revalidating a cached copy if there is one.
+        Returns the path of the cached body, raises requests.RequestException
+        on failure.
+        """
+        get_metrics().increment('http_requests')
+        with get_metrics().span('http'):
+            return self._fetch(url, session, headers, timeout)
+
+    def _fetch(self, url, session, headers, timeout):
+        session = session or requests
+        body_path, meta_path = self._paths(url)
+        headers = dict(headers or {})
+        meta = self._load_meta(meta_path) if os.path.exists(body_path) else None
+        if meta:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        with get_request_scheduler().get(session, url, headers=headers, timeout=timeout, stream=True) as response:
+            if response.status_code == 304 and meta:
+                os.utime(body_path)
+                get_metrics().increment('http_cache_hits')
+                with self._lock:
+                    self.stats['hits'] += 1
+                    self.stats['bytes_served_from_cache'] += os.path.getsize(body_path)
+                return body_path
+            response.raise_for_status()
+
+            file_descriptor, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(file_descriptor, 'wb') as temp_file:
+                response.raw.decode_content = True
+                shutil.copyfileobj(response.raw, temp_file)
+            new_meta = {
+                "url": url,
+                "etag": response.headers.get('ETag'),
+                "last_modified": response.headers.get('Last-Modified'),
+                "fetched_at": time.time()
+            }
+
+        old_size = os.path.getsize(body_path) if os.path.exists(body_path) else 0
+        new_size = os.path.getsize(temp_path)
+        os.replace(temp_path, body_path)
+        with open(meta_path, 'w') as meta_file:
+            json.dump(new_meta, meta_file)
+        get_metrics().increment('http_cache_misses')
+        get_metrics().increment('http_bytes_fetched', new_size)
+        with self._lock:
+            self.stats['misses'] += 1
+            self.stats['bytes_fetched'] += new_size
+            self._total_size += new_size - old_size
+            if self._total_size > self.max_bytes:
+                self._evict(keep=body_path)
+        return body_path
+
+    def get_content(self, url, session=None, headers=None, timeout=REQUEST_TIMEOUT):
+        # Body of url as bytes, see fetch
+        with open(self.fetch(url, session, headers, timeout), 'rb') as body_file:
+            return body_file.read()
+
+    def _evict(self, keep=None):
+        for path, _, size in sorted(self._entries(), key=lambda entry: entry[1]):
+            if self._total_size <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            for stale_path in [path, path[:-len('.body')] + '.json']:
+                try:
+                    os.remove(stale_path)
+                except FileNotFoundError:
+                    pass
+            self._total_size -= size
+            self.stats['evictions'] += 1
+
+    def report(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['total_size'] = self._total_size
+        return stats
+
+
+_http_cache = None
+_http_cache_lock = threading.Lock()
+
+
+def get_http_cache():
+    global _http_cache
+    with _http_cache_lock:
+        if _http_cache is None:
+            _http_cache = HTTPCache()
+        return _http_cache
+
+
+def configure_ssl_certificates():
+    # Points SSL_CERT_FILE (used by git and other OpenSSL clients) at certifi's bundle,
+    # called by the commands reaching the network rather than on import
+    import certifi
+    os.environ['SSL_CERT_FILE'] = certifi.where()
+
+
+def download_file(url, local_filename, token):
+    # Copies url to local_filename, downloading it only when it changed upstream. The copy is
+    # swapped in whole, processes (e.g. shards) reading local_filename never see it half written
+    headers = {'Authorization': f'token {token}'}
+    try:
+        body_path = get_http_cache().fetch(url, headers=headers)
+        file_descriptor, temp_path = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(local_filename)), suffix='.tmp'
+        )
+        os.close(file_descriptor)
+        shutil.copyfile(body_path, temp_path)
+        os.replace(temp_path, local_filename)
+    except requests.RequestException as e:
+        print(f"Failed to download file from {url}. Exception: {e}")
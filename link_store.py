@@ -0,0 +1,134 @@
+import csv
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from constants import LINKS_DB_PATH
+from dashboard_stream import normalize_name
+
+DASHBOARD_FIELDS = ['dependency', 'source', 'is_git_supported']
+
+
+class LinkStore:
+    """
+    SQLite store of resolved source code links, indexed by the PEP 503
+    normalized dependency name.
+
+    Lookups go through the primary key index, rows are written in batched
+    transactions, and dependencies_dashboard.csv is exported from the store
+    instead of being appended to row by row.
+    """
+
+    def __init__(self, db_path=LINKS_DB_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS links ("
+            " name TEXT PRIMARY KEY,"
+            " dependency TEXT NOT NULL,"
+            " source TEXT,"
+            " is_git_supported INTEGER NOT NULL,"
+            " last_resolved TEXT NOT NULL)"
+        )
+        self._connection.commit()
+
+    def __contains__(self, dependency_name):
+        return self.get(dependency_name) is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM links").fetchone()[0]
+
+    def _to_link(self, row):
+        dependency, source, is_git_supported, last_resolved = row
+        return {
+            "dependency": dependency,
+            "source": source,
+            "is_git_supported": bool(is_git_supported),
+            "last_resolved": last_resolved
+        }
+
+    def get(self, dependency_name):
+        # The link of a dependency, looked up by its normalized name, or None
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT dependency, source, is_git_supported, last_resolved FROM links WHERE name = ?",
+                (normalize_name(dependency_name),)
+            ).fetchone()
+        return self._to_link(row) if row else None
+
+    def all_links(self):
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT dependency, source, is_git_supported, last_resolved FROM links ORDER BY rowid"
+            ).fetchall()
+        return [self._to_link(row) for row in rows]
+
+    def upsert_many(self, links, resolved_at=None):
+        """
+        Inserts or updates many links in one transaction.
+
+        links: dicts with 'dependency', 'source' and 'is_git_supported' keys
+        resolved_at: last resolved timestamp to record, defaults to now
+        """
+        resolved_at = resolved_at or datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT INTO links (name, dependency, source, is_git_supported, last_resolved)"
+                " VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT(name) DO UPDATE SET"
+                " dependency = excluded.dependency, source = excluded.source,"
+                " is_git_supported = excluded.is_git_supported, last_resolved = excluded.last_resolved",
+                [
+                    (
+                        normalize_name(link['dependency']),
+                        link['dependency'],
+                        link['source'],
+                        int(link['is_git_supported'] in (True, 'True')),
+                        link.get('last_resolved') or resolved_at
+                    )
+                    for link in links
+                ]
+            )
+
+    def import_csv(self, dependency_dashboard_csv_path):
+        # Loads an existing dependencies_dashboard.csv, the timestamp row is used as resolved time
+        with open(dependency_dashboard_csv_path, 'r', newline='') as csv_file:
+            csv_reader = csv.reader(csv_file)
+            timestamp_row = next(csv_reader, None)
+            header = next(csv_reader, None)
+            if not header:
+                return 0
+            links = [dict(zip(header, row)) for row in csv_reader if row]
+        self.upsert_many(links, resolved_at=timestamp_row[0] if timestamp_row else None)
+        return len(links)
+
+    def export_csv(self, dependency_dashboard_csv_path):
+        """
+        Writes the dashboard in its existing layout (timestamp row, header,
+        one row per dependency). The file is written next to the target and
+        renamed over it, so a crash never leaves a truncated dashboard.
+        """
+        temp_path = dependency_dashboard_csv_path + '.tmp'
+        with open(temp_path, 'w', newline='') as csv_file:
+            csv_writer = csv.writer(csv_file)
+            csv_writer.writerow([datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')])
+            csv_writer.writerow(DASHBOARD_FIELDS)
+            for link in self.all_links():
+                csv_writer.writerow([link[field] for field in DASHBOARD_FIELDS])
+        os.replace(temp_path, dependency_dashboard_csv_path)
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+def open_link_store(dependency_dashboard_csv_path, db_path=LINKS_DB_PATH):
+    # Opens the store, seeding it from an existing dashboard CSV on first use
+    store = LinkStore(db_path)
+    if not len(store) and os.path.exists(dependency_dashboard_csv_path):
+        print(f"Imported {store.import_csv(dependency_dashboard_csv_path)} links from {dependency_dashboard_csv_path}")
+    return store
@@ -1,145 +1,108 @@
+import argparse
 import json
-import os
-import tempfile
-import subprocess
-import toml
-from fetch_dependencies import get_dependencies
-
+from functools import partial
+
+from checkpoints import CheckpointStore, CheckpointedAnalyzer
+from constants import (
+    CHECKPOINTS_DB_PATH,
+    DJANGO_TARGET_VERSIONS,
+    LINKS_DB_PATH,
+    MIRROR_CACHE_DIR,
+    PYTHON_TARGET_VERSIONS,
+    RESULTS_DB_PATH
+)
+from fingerprints import FINGERPRINTS_FILE, FingerprintStore, IncrementalAnalyzer
+from http_cache import configure_ssl_certificates
+from link_store import open_link_store
+from metrics import get_metrics
+from mirror_cache import get_mirror_cache, normalize_repo_url
+from package_metadata import get_facts_cache, supports_version
+from pipeline import run_pipeline
+from release_search import find_first_supporting_releases
+from release_tags import normalize_release_tags, report_pruning
+from repo_sources import RecordedRepoSource, as_repo_source, uses_github_api
+from results_store import open_results_store
+from shards import in_shard, shard_argument, shard_path
 from source_code_links_scrapper import scrape_links
+from source_urls import split_repo_url
+from support_table import get_support_table
 
 
-def check_version_in_toml(version_type, repo_dir, version):
-    """
-    version_type: Django or Python
-    repo_dir: repository path
-    version: version to look for
-    """
-    # Read the pyproject.toml file
-    pyproject_toml_file_path = repo_dir + "/pyproject.toml"
-    try:
-        with open(pyproject_toml_file_path, 'r', encoding='utf-8') as toml_file:
-            data = toml.load(toml_file)
-    except FileNotFoundError:
-        return False  # File not found
-    except toml.TomlDecodeError:
-        return False  # Invalid TOML format
+def clone_repository(repo_url):
+    # Bare partial clone kept in the persistent mirror cache, only new refs
+    # are fetched when the repository was already cloned by an earlier run.
+    # The mirror is leased until get_mirror_cache().release(repo_url) is called.
+    return get_mirror_cache().acquire(repo_url)
 
-    if version_type == "python":
-        classifiers = data.get('project', {}).get('classifiers', [])
-        return any(f"Programming Language :: Python :: {version}" in classifier for classifier in classifiers)
-    elif version_type == "django":
-        classifiers = data.get('project', {}).get('dependencies', [])
-        return any(f"Django=={version}" in classifier for classifier in classifiers)
 
+def repository_key(dependency):
+    # Dependencies with the same key live in the same repository and share one clone
+    return normalize_repo_url(split_repo_url(dependency['source'])[0])
 
-def clone_repository(repo_url):
-    temp_dir = tempfile.mkdtemp()
-    # temp_dir = f"/Users/zubairshkoor/Documents/edx/test_poc/{dependency}" # only for testing
-    # if os.path.exists(temp_dir):
-    #     print(f"Repository already exists at: {temp_dir}")
-    # else:
-    #     os.makedirs(temp_dir, exist_ok=True)
-    #     subprocess.run(['git', 'clone', repo_url, temp_dir])
-    #     print(f"Repository cloned to: {temp_dir}")
+def get_release_tags(repo, package_name=None):
+    """
+    repo: repository path or source (see repo_sources)
+    Release tags of the repository worth probing, oldest first: tags that
+    parse as versions (of package_name in a monorepo), without pre-releases,
+    up to the latest release of the default branch and with consecutive
+    tags of an identical tree collapsed. Returns None if there are none.
+    """
+    with get_metrics().span('list_tags'):
+        try:
+            source = as_repo_source(repo)
+            tag_states = source.tag_states()
+            if not tag_states:
+                return None
+            tags, report = normalize_release_tags(tag_states, package_name, source.latest_release_tag())
+        except Exception as ex:
+            print(str(ex))
+            return None
+    report_pruning(source.name, tags, report)
+    return tags or None
 
-    try:
-        subprocess.run(['git', 'clone', repo_url, temp_dir], check=True)
-        print(f"Repository cloned to: {temp_dir}")
-    except subprocess.CalledProcessError as e:
-        print(f"Error cloning repository: {e}")
-        # Optionally, you can clean up the temporary directory if the cloning fails
-        if os.path.exists(temp_dir):
-            os.rmdir(temp_dir)
-        return None
-
-    return temp_dir
-
-def get_release_tags(repo_dir):
-    try:
-        subprocess.run(['git', 'fetch', '--tags'], cwd=repo_dir)
-        git_tags = subprocess.check_output(['git', 'tag', '--sort=version:refname'], cwd=repo_dir, text=True)
-        all_tags_list = git_tags.strip().split('\n')
-        latest_tag = get_latest_release_tag(repo_dir)
-        if not latest_tag and len(all_tags_list):
-            return all_tags_list
-        elif latest_tag and len(all_tags_list):
-            return all_tags_list[:all_tags_list.index(latest_tag)+1]
-        else:
-            None
-    except Exception as ex:
-        print(str(ex))
-        return None
-
-
-def get_latest_release_tag(repo_dir):
-    try:
-        # Run the Git command to get the latest tag on the specified branch
-        return subprocess.check_output(["git", "describe", "--tags", "--abbrev=0", get_default_branch(repo_dir)], cwd=repo_dir, text=True).strip()
-    
-    except subprocess.CalledProcessError as e:
-        # Handle errors, e.g., when there are no tags on the specified branch
-        print(f"Error: {e}")
-        return None
 
+def find_django_version_in_setup_py_classifier(repo, tag, version, subdir=None):
+    return supports_version(as_repo_source(repo).package_facts(tag, subdir), "django", version)
 
-def get_default_branch(repo_dir):
-    # Get the symbolic reference for the remote's HEAD
-    try:
-        default_branch_ref = subprocess.check_output(
-            ['git', 'symbolic-ref', 'refs/remotes/origin/HEAD'],
-            cwd=repo_dir, text=True
-        ).strip()
-        # Extract the branch name
-        default_branch = default_branch_ref.split('/')[-1]
-        return default_branch
-    except subprocess.CalledProcessError as e:
-        print(f"Error: {e}")
-        return "No Default Branch"
-
-def find_django_version_in_setup_py_classifier(repo_dir, tag, version):
-    subprocess.run(['git', 'checkout', tag], cwd=repo_dir)
-    setup_py_path = os.path.join(repo_dir, 'setup.py')
-    setup_cfg_path = os.path.join(repo_dir, 'setup.cfg')
-
-    if not os.path.exists(setup_py_path):
-        setup_py_path = None
-    if not os.path.exists(setup_cfg_path):
-        setup_cfg_path = None
-
-    if setup_py_path:
-        with open(setup_py_path, 'r') as setup_py_file:
-            if f"Framework :: Django :: {version}" in setup_py_file.read():
-                return True
-    if setup_cfg_path:
-        with open(setup_cfg_path, 'r') as setup_cfg_file:
-            if f"Framework :: Django :: {version}" in setup_cfg_file.read():
-                return True
-    if check_version_in_toml("django", repo_dir, version):
-        return True
-    return False
 
+def find_python_version_in_config_files(repo, tag, version, subdir=None):
+    return supports_version(as_repo_source(repo).package_facts(tag, subdir), "python", version)
 
-def find_python_version_in_config_files(repo_dir, tag, version):
-    subprocess.run(['git', 'checkout', tag], cwd=repo_dir)
-    setup_py_path = os.path.join(repo_dir, 'setup.py')
-    setup_cfg_path = os.path.join(repo_dir, 'setup.cfg')
-
-    if not os.path.exists(setup_py_path):
-        setup_py_path = None
-    if not os.path.exists(setup_cfg_path):
-        setup_cfg_path = None
-
-    if setup_py_path:
-        with open(setup_py_path, 'r') as setup_py_file:
-            if f"Programming Language :: Python :: {version}" in setup_py_file.read():
-                return True
-    if setup_cfg_path:
-        with open(setup_cfg_path, 'r') as setup_cfg_file:
-            if f"Programming Language :: Python :: {version}" in setup_cfg_file.read():
-                return True
-    if check_version_in_toml("python", repo_dir, version):
-        return True
-    return False
+
+def find_first_supporting_releases_of(repo, release_tags, target_versions, subdir=None):
+    """
+    repo: repository path or source (see repo_sources)
+    target_versions: dict mapping django/python to the versions to look for
+    subdir: directory of the package's packaging files in a monorepo
+    Returns a dict mapping django/python to a dict from each version to the
+    release that first added support for it, the default branch if only the
+    default branch supports it, or None.
+
+    The packaging files of each tag are read and parsed once, and every
+    Django and Python version is answered from the same per-tag facts.
+    """
+    source = as_repo_source(repo)
+    facts_by_ref = {}
+
+    def ref_supports(ref, target):
+        if ref not in facts_by_ref:
+            get_metrics().increment('tags_examined')
+            with get_metrics().span('probe'):
+                facts_by_ref[ref] = source.package_facts(ref, subdir)
+        return supports_version(facts_by_ref[ref], *target)
+
+    targets = [(version_type, version) for version_type, versions in target_versions.items() for version in versions]
+    first_releases = find_first_supporting_releases(release_tags, ref_supports, targets)
+    default_branch = source.default_branch()
+    for target, first_tag in first_releases.items():
+        # if the latest tag lacks support then try with the default branch as well
+        if not first_tag and ref_supports(default_branch, target):
+            first_releases[target] = default_branch
+
+    results = {version_type: {} for version_type in target_versions}
+    for (version_type, version), first_release in first_releases.items():
+        results[version_type][version] = first_release
+    return results
 
 
 # def get_local_repo_info(repo_dir):
@@ -160,21 +123,48 @@ def find_python_version_in_config_files(repo_dir, tag, version):
 # existing_script.py
 
 
-def save_update(results):
-    with open("updates.json", "a") as file:
-        json.dump(results, file)
-        file.write("\n")
+# Replaced with --repo-source, None uses REPO_SOURCE_BACKEND
+repo_source_backend = None
+# Replaced with --django-versions/--python-versions
+target_versions = {"django": DJANGO_TARGET_VERSIONS, "python": PYTHON_TARGET_VERSIONS}
+
+# Per-shard paths replace these with --shard
+updates_file_path = "updates.json"
+results_db_path = RESULTS_DB_PATH
+_results_store = None
+
+
+def get_results_store():
+    global _results_store
+    if _results_store is None:
+        _results_store = open_results_store(updates_file_path, results_db_path)
+    return _results_store
+
+
+def save_update(results, run_id=None):
+    # Upsert into the results store, the JSON line keeps updates.json readers working
+    with get_metrics().dependency(','.join(results)), get_metrics().span('results_write'):
+        get_results_store().upsert(results, run_id or get_results_store().start_run())
+        with open(updates_file_path, "a") as file:
+            json.dump(results, file)
+            file.write("\n")
+
+def covers_target_versions(result):
+    # Whether a saved result answers every target version, results of skipped dependencies always do
+    if result.get('skipped'):
+        return True
+    needed = {"django": target_versions['django'] if result.get('is_django') else [], "python": target_versions['python']}
+    return all(version in (result.get(version_type) or {}) for version_type, versions in needed.items() for version in versions)
+
 
-def is_django_package(repo_dir):
+def is_django_package(repo, ref='HEAD', subdir=None):
     setup_files = ['setup.py', 'setup.cfg']
+    source = as_repo_source(repo)
 
     for setup_file in setup_files:
-        file_path = os.path.join(repo_dir, setup_file)
-        if os.path.exists(file_path):
-            with open(file_path, 'r') as file:
-                content = file.read()
-                if "'Framework :: Django" in content:
-                    return True
+        content = source.read_file(ref, f"{subdir.strip('/')}/{setup_file}" if subdir else setup_file)
+        if content and "'Framework :: Django" in content:
+            return True
 
     return False
 
@@ -185,85 +175,214 @@ def read_updates_file(file_path):
     return updates_list
 
 
-if __name__ == '__main__':
-    source_code_urls = scrape_links()
-    source_code_urls = [url for url in source_code_urls if url["is_git_supported"]]
-    for dependency in source_code_urls:
-        results = {}
-        repo_url = dependency['source']
-        dependency_name = dependency['dependency']
-
-        repo_dir = clone_repository(repo_url)
-        if not repo_dir:
-            results[dependency_name] = {
-                "repo_url": repo_url,
-                "skipped": True,
-                "reason": "no_access"
-            }
-            print(f"No access on: {repo_url}")
-            save_update(results)
-            continue
-        release_tags = get_release_tags(repo_dir)
-        if not release_tags:
-            results[dependency_name] = {
-                "repo_url": repo_url,
-                "skipped": True,
-                "reason": "no_tag_found"
-            }
-            print(f"There is not tag found for {dependency_name}: {repo_url}")
-            save_update(results)
-            continue
-        latest_tag_having_django_support = None
-        latest_tag_having_python_support = None
-        django_versions = ['4.0', '4.1', '4.2']
-        python_versions = ['3.11', '3.10', '3.9']
-        results[dependency_name] = {}
-        results[dependency_name]["django"] = {}
-        results[dependency_name]["python"] = {}
-        desc_tags_list = list(reversed(release_tags))
-        if is_django_package(repo_dir):
-            results[dependency_name]['is_django'] = True
-            for version in django_versions:
-                for tag in desc_tags_list:
-                    if not find_django_version_in_setup_py_classifier(repo_dir, tag, version):
-                        if tag == desc_tags_list[0]: # if the tag is latest the try with default latest/default branch as well
-                            default_branch = get_default_branch(repo_dir)
-                            if find_django_version_in_setup_py_classifier(repo_dir, default_branch, version):
-                                print(f"Django {version} support in {repo_url.split('/')[-1].split('.')[0]} was first added in default branch: {default_branch}")
-                                results[dependency_name]['django'][version] = default_branch
-                            else:
-                                results[dependency_name]['django'][version] = None
-                            break
-                        print(f"Django {version} support in {repo_url.split('/')[-1].split('.')[0]} was first added in release: {latest_tag_having_django_support}")
-                        results[dependency_name]['django'][version] = latest_tag_having_django_support
-                        break
-                    else:
-                        latest_tag_having_django_support = tag
-        else:
-            results[dependency_name]['is_django'] = False
-
-        for version in python_versions:
-            for tag in desc_tags_list:
-                if not find_python_version_in_config_files(repo_dir, tag, version):
-                    if tag == desc_tags_list[0]: # if the tag is latest the try with default latest/default branch as well
-                        default_branch = get_default_branch(repo_dir)
-                        if find_python_version_in_config_files(repo_dir, default_branch, version):
-                            print(f"Python {version} support in {repo_url.split('/')[-1].split('.')[0]} was first added in default branch: {default_branch}")
-                            results[dependency_name]['python'][version] = default_branch
-                        else:
-                            results[dependency_name]['python'][version] = None
-                        break
-
-                    print(f"Python {version} support in {repo_url.split('/')[-1].split('.')[0]} was first added in release: {latest_tag_having_python_support}")
-                    results[dependency_name]['python'][version] = latest_tag_having_python_support
-                    break
-                else:
-                    latest_tag_having_python_support = tag
-        # total_pull_requests, last_commit_sha, last_commit_datetime = get_local_repo_info(repo_dir)
-        # results[dependency_name]["total_pull_requests"] = total_pull_requests
-        # results[dependency_name]["last_commit_sha"] = last_commit_sha
-        # results[dependency_name]["last_commit_datetime"] = last_commit_datetime
-
-        # Save the results to the file using file handling methods
-        save_update(results)
+def analyze_dependency(dependency, on_stage=None):
+    """
+    Opens the dependency's repository (a leased mirror, or the GitHub API
+    with the github-api backend, behind what the support table recorded by
+    earlier runs) and finds the first releases that
+    support each Django and Python version.
+
+    dependency: dict with 'dependency' and 'source' keys (see scrape_links)
+    on_stage: optional callable, called with the name of each stage reached
+        (cloned, tags_listed, probed)
+    Returns the results dict to save for the dependency.
+    """
+    on_stage = on_stage or (lambda stage: None)
+    results = {}
+    repo_url = dependency['source']
+    dependency_name = dependency['dependency']
+    # Packages of a monorepo link to their subdirectory, the repository itself is opened
+    clone_url, subdir = split_repo_url(repo_url)
+
+    source = RecordedRepoSource.open(clone_url, repo_source_backend)
+    if not source:
+        results[dependency_name] = {
+            "repo_url": repo_url,
+            "skipped": True,
+            "reason": "no_access"
+        }
+        print(f"No access on: {repo_url}")
+        return results
+    try:
+        return analyze_cloned_dependency(dependency, source, subdir, on_stage)
+    finally:
+        source.close()
+
+
+def analyze_cloned_dependency(dependency, source, subdir, on_stage):
+    # Tag listing and probing part of analyze_dependency, on the opened repository source
+    results = {}
+    repo_url = dependency['source']
+    dependency_name = dependency['dependency']
+    on_stage('cloned')
+    release_tags = get_release_tags(source, dependency_name)
+    if not release_tags:
+        results[dependency_name] = {
+            "repo_url": repo_url,
+            "skipped": True,
+            "reason": "no_tag_found"
+        }
+        print(f"There is not tag found for {dependency_name}: {repo_url}")
+        return results
+    on_stage('tags_listed')
+    repo_name = repo_url.split('/')[-1].split('.')[0]
+    results[dependency_name] = {}
+    results[dependency_name]["django"] = {}
+    results[dependency_name]["python"] = {}
+    is_django = is_django_package(source, subdir=subdir)
+    results[dependency_name]['is_django'] = is_django
+    first_releases = find_first_supporting_releases_of(source, release_tags, {
+        "django": target_versions['django'] if is_django else [],
+        "python": target_versions['python']
+    }, subdir)
+    default_branch = source.default_branch()
+    # Tells first releases that are the default branch apart in reports
+    results[dependency_name]['default_branch'] = default_branch
+    for version_type, label in [("django", "Django"), ("python", "Python")]:
+        for version, first_release in first_releases[version_type].items():
+            if first_release == default_branch:
+                print(f"{label} {version} support in {repo_name} was first added in default branch: {default_branch}")
+            elif first_release:
+                print(f"{label} {version} support in {repo_name} was first added in release: {first_release}")
+            results[dependency_name][version_type][version] = first_release
+    # total_pull_requests, last_commit_sha, last_commit_datetime = get_local_repo_info(repo_dir)
+    # results[dependency_name]["total_pull_requests"] = total_pull_requests
+    # results[dependency_name]["last_commit_sha"] = last_commit_sha
+    # results[dependency_name]["last_commit_datetime"] = last_commit_datetime
+
+    on_stage('probed')
+    return results
+
+
+def add_arguments(parser):
+    parser.add_argument('--workers', type=int, default=1, help="number of dependencies analyzed concurrently")
+    parser.add_argument(
+        '--incremental', action='store_true',
+        help="analyze every dependency on the dashboard, skipping the ones unchanged upstream since their last result"
+    )
+    parser.add_argument(
+        '--resume', action='store_true',
+        help="continue the last interrupted run, retrying only the dependencies that were not saved"
+    )
+    parser.add_argument(
+        '--shard', type=shard_argument, help="only analyze shard i/N of the dependencies (i from 0), writing per-shard files; "
+                        "combine them with `python shards.py merge N`"
+    )
+    parser.add_argument(
+        '--disk-budget', type=float,
+        help="GiB the repository mirrors may use (per shard with --shard), defaults to MIRROR_CACHE_MAX_BYTES"
+    )
+    parser.add_argument(
+        '--ephemeral', action='store_true',
+        help="delete each repository mirror as soon as all its packages were analyzed"
+    )
+    parser.add_argument(
+        '--repo-source', choices=['git', 'github-api', 'auto'],
+        help="read GitHub repositories through the GitHub API instead of cloning them (github-api), "
+             "only when a token is set (auto), or clone everything (git); defaults to REPO_SOURCE_BACKEND"
+    )
+    parser.add_argument(
+        '--django-versions', help="comma separated Django versions to look for, e.g. 4.2,5.0; "
+                                  "defaults to DJANGO_TARGET_VERSIONS"
+    )
+    parser.add_argument(
+        '--python-versions', help="comma separated Python versions to look for, e.g. 3.11,3.12; "
+                                  "defaults to PYTHON_TARGET_VERSIONS"
+    )
+    parser.add_argument('--metrics-file', default=None, help="where to write the JSON timing and counter summary, metrics.json by default")
+    parser.add_argument('--prometheus-textfile', help="also write the metrics in Prometheus textfile format to this path")
+
+
+def run(args):
+    # Resolves the dependency links and analyzes them, see add_arguments for the options
+    global updates_file_path, results_db_path, repo_source_backend
+    configure_ssl_certificates()
+
+    shard = args.shard
+    if shard:
+        updates_file_path = shard_path(updates_file_path, shard)
+        results_db_path = shard_path(results_db_path, shard)
+        print(f"Running shard {shard[0]}/{shard[1]}, results go to {updates_file_path}")
+
+    repo_source_backend = args.repo_source
+    if args.django_versions:
+        target_versions['django'] = [version.strip() for version in args.django_versions.split(',') if version.strip()]
+    if args.python_versions:
+        target_versions['python'] = [version.strip() for version in args.python_versions.split(',') if version.strip()]
+    # Shards run as separate processes, which can't share a mirror cache directory
+    mirror_cache = get_mirror_cache(shard_path(MIRROR_CACHE_DIR, shard))
+    if args.disk_budget is not None:
+        mirror_cache.max_bytes = int(args.disk_budget * 1024 ** 3)
+    mirror_cache.ephemeral = mirror_cache.ephemeral or args.ephemeral
+    checkpoint_store = CheckpointStore(shard_path(CHECKPOINTS_DB_PATH, shard))
+    resumed_run = checkpoint_store.last_unfinished_run() if args.resume else None
+    if resumed_run:
+        run_id, source_code_urls = resumed_run
+        unfinished_dependencies = checkpoint_store.unfinished(run_id)
+        for dependency_name, (stage, reason, attempts) in checkpoint_store.failures(run_id).items():
+            print(f"Retrying {dependency_name}, failed after {stage} ({attempts} failed attempts): {reason}")
+        source_code_urls = [url for url in source_code_urls if url['dependency'] in unfinished_dependencies]
+        print(f"Resuming run {run_id}, {len(source_code_urls)} dependencies left")
+    else:
+        if args.resume:
+            print("No interrupted run to resume, starting a new one")
+        source_code_urls = scrape_links(shard)
+        if args.incremental:
+            link_store = open_link_store(
+                shard_path("dependencies_dashboard.csv", shard), shard_path(LINKS_DB_PATH, shard)
+            )
+            source_code_urls = [link for link in link_store.all_links() if in_shard(link['dependency'], shard)]
+            link_store.close()
+        source_code_urls = [url for url in source_code_urls if url["is_git_supported"]]
+        run_id = get_results_store().start_run()
+        checkpoint_store.start_run(run_id, source_code_urls)
+        print(f"Starting run {run_id}")
+
+    analyze, save = analyze_dependency, partial(save_update, run_id=run_id)
+    if args.incremental:
+        # Results lacking a target version are computed again, mostly from the support table
+        analyzed_dependencies = [
+            dependency_name for dependency_name, result, _ in get_results_store().latest_entries()
+            if covers_target_versions(result)
+        ]
+        incremental_analyzer = IncrementalAnalyzer(
+            analyze, save, analyzed_dependencies, FingerprintStore(shard_path(FINGERPRINTS_FILE, shard))
+        )
+        analyze, save = incremental_analyzer.analyze, incremental_analyzer.save
+    checkpointed_analyzer = CheckpointedAnalyzer(analyze, save, checkpoint_store, run_id)
+    mirror_cache.expect(
+        repo_url for repo_url in (split_repo_url(url['source'])[0] for url in source_code_urls)
+        if not uses_github_api(repo_url, repo_source_backend)
+    )
+    run_pipeline(
+        source_code_urls, checkpointed_analyzer.analyze, checkpointed_analyzer.save,
+        workers=args.workers, group_key=repository_key
+    )
+    if args.incremental:
+        print(f"Skipped {incremental_analyzer.skipped} dependencies unchanged upstream")
+
+    failures = checkpoint_store.failures(run_id)
+    if failures:
+        print(f"{len(failures)} dependencies failed, run with --resume to retry them: {sorted(failures)}")
+    else:
+        checkpoint_store.finish_run(run_id)
+
+    mirror_cache.close()
+    mirror_stats = mirror_cache.report()
+    print(f"Mirror cache stats: {mirror_stats}")
+    print(f"Peak mirror disk use: {mirror_stats['peak_bytes'] / 1024 ** 2:.1f} MiB")
+    print(f"Facts cache stats: {get_facts_cache().report()}")
+    print(f"Support table stats: {get_support_table().report()}")
+    metrics = get_metrics()
+    metrics_file = args.metrics_file or shard_path("metrics.json", shard)
+    metrics.write_json(metrics_file)
+    if args.prometheus_textfile:
+        metrics.write_prometheus(args.prometheus_textfile)
+    print(f"Slowest dependencies: {metrics.slowest_dependencies(5)}")
+    print(f"Metrics written to {metrics_file}")
 
+
+if __name__ == '__main__':
+    main_parser = argparse.ArgumentParser(description="Find the first releases of dependencies supporting new Django/Python versions")
+    add_arguments(main_parser)
+    run(main_parser.parse_args())
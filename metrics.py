@@ -0,0 +1,161 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+PROMETHEUS_PREFIX = 'pypi_dependencies'
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _write_atomically(path, text):
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w') as output_file:
+        output_file.write(text)
+    os.replace(temp_path, path)
+
+
+class Metrics:
+    """
+    Timing spans and counters of a run, overall and per dependency.
+
+    Work done for a dependency is attributed to it by wrapping it in
+    `with metrics.dependency(name):`, which is tracked per thread, so spans
+    and counters recorded from the worker analyzing it (or the writer saving
+    it) show up in its breakdown.
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self._spans = {}
+        self._counters = {}
+        self._per_dependency = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def current_dependency(self):
+        return getattr(self._local, 'dependency', None)
+
+    @contextmanager
+    def dependency(self, dependency_name):
+        previous = self.current_dependency()
+        self._local.dependency = dependency_name
+        try:
+            yield
+        finally:
+            self._local.dependency = previous
+
+    def _dependency_entry(self, dependency_name):
+        return self._per_dependency.setdefault(dependency_name, {"seconds": {}, "counters": {}})
+
+    @contextmanager
+    def span(self, name):
+        # Times the block, failed attempts included
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started_at
+            dependency_name = self.current_dependency()
+            with self._lock:
+                span = self._spans.setdefault(name, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+                span['count'] += 1
+                span['total_seconds'] += elapsed
+                span['max_seconds'] = max(span['max_seconds'], elapsed)
+                if dependency_name is not None:
+                    seconds = self._dependency_entry(dependency_name)['seconds']
+                    seconds[name] = seconds.get(name, 0.0) + elapsed
+
+    def increment(self, counter, value=1):
+        dependency_name = self.current_dependency()
+        with self._lock:
+            self._counters[counter] = self._counters.get(counter, 0) + value
+            if dependency_name is not None:
+                counters = self._dependency_entry(dependency_name)['counters']
+                counters[counter] = counters.get(counter, 0) + value
+
+    def summary(self):
+        """
+        Returns the spans, counters and per-dependency breakdown as a dict,
+        dependencies sorted from the slowest to analyze.
+        """
+        with self._lock:
+            spans = {
+                name: {
+                    "count": span['count'],
+                    "total_seconds": round(span['total_seconds'], 6),
+                    "max_seconds": round(span['max_seconds'], 6)
+                }
+                for name, span in sorted(self._spans.items())
+            }
+            counters = dict(sorted(self._counters.items()))
+            per_dependency = {
+                dependency_name: {
+                    "seconds": {name: round(seconds, 6) for name, seconds in sorted(entry['seconds'].items())},
+                    "counters": dict(sorted(entry['counters'].items()))
+                }
+                for dependency_name, entry in sorted(
+                    self._per_dependency.items(),
+                    key=lambda item: -item[1]['seconds'].get('analyze', 0.0)
+                )
+            }
+        return {
+            "started_at": self.started_at,
+            "elapsed_seconds": round(time.time() - self.started_at, 3),
+            "spans": spans,
+            "counters": counters,
+            "dependencies": per_dependency
+        }
+
+    def slowest_dependencies(self, count=10):
+        # (dependency, seconds analyzing it) of the slowest ones
+        return [
+            (dependency_name, entry['seconds'].get('analyze', 0.0))
+            for dependency_name, entry in list(self.summary()['dependencies'].items())[:count]
+        ]
+
+    def write_json(self, path):
+        _write_atomically(path, json.dumps(self.summary(), indent=2))
+
+    def prometheus_text(self):
+        # Prometheus text exposition format, for the node_exporter textfile collector
+        summary = self.summary()
+        lines = []
+
+        def metric(name, metric_type, help_text, samples):
+            lines.append(f"# HELP {PROMETHEUS_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PROMETHEUS_PREFIX}_{name} {metric_type}")
+            for labels, value in samples:
+                label_text = ','.join(f'{key}="{_escape_label(label)}"' for key, label in labels.items())
+                lines.append(f"{PROMETHEUS_PREFIX}_{name}{{{label_text}}} {value}" if labels
+                             else f"{PROMETHEUS_PREFIX}_{name} {value}")
+
+        spans = summary['spans']
+        metric('span_seconds_total', 'counter', "Time spent in each stage.",
+               [({"span": name}, span['total_seconds']) for name, span in spans.items()])
+        metric('span_count_total', 'counter', "Number of times each stage ran.",
+               [({"span": name}, span['count']) for name, span in spans.items()])
+        metric('span_max_seconds', 'gauge', "Longest single run of each stage.",
+               [({"span": name}, span['max_seconds']) for name, span in spans.items()])
+        for counter, value in summary['counters'].items():
+            metric(f"{counter}_total", 'counter', f"Total {counter.replace('_', ' ')}.", [({}, value)])
+        metric('dependency_seconds', 'gauge', "Time spent in each stage per dependency.", [
+            ({"dependency": dependency_name, "span": name}, seconds)
+            for dependency_name, entry in summary['dependencies'].items()
+            for name, seconds in entry['seconds'].items()
+        ])
+        metric('run_elapsed_seconds', 'gauge', "Wall time of the run so far.", [({}, summary['elapsed_seconds'])])
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        _write_atomically(path, self.prometheus_text())
+
+
+_metrics = Metrics()
+
+
+def get_metrics():
+    return _metrics
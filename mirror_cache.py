@@ -0,0 +1,307 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+
+from constants import MIRROR_CACHE_DIR, MIRROR_CACHE_EPHEMERAL, MIRROR_CACHE_MAX_BYTES
+from metrics import get_metrics
+from rate_limits import get_request_scheduler
+
+CASE_INSENSITIVE_HOSTS = ['github.com', 'gitlab.com', 'bitbucket.org']
+# Mirrors missing from the index are leftovers of interrupted clones once this old
+ORPHAN_MAX_AGE = 3600
+
+
+def normalize_repo_url(repo_url):
+    """
+    Normalizes a repository URL so that the different spellings of one
+    repository (scheme, `.git` suffix, case, trailing slashes) map to the
+    same cache entry.
+    """
+    url = repo_url.strip().rstrip('/')
+    url = re.sub(r'^(git\+)?(https?|git|ssh)://', '', url)
+    url = re.sub(r'^git@([^:]+):', r'\1/', url)
+    if url.endswith('.git'):
+        url = url[:-len('.git')]
+    host, _, path = url.partition('/')
+    host = host.lower()
+    if host.startswith('www.'):
+        host = host[len('www.'):]
+    if host in CASE_INSENSITIVE_HOSTS:
+        path = path.lower()
+    return f"https://{host}/{path}".rstrip('/')
+
+
+def get_dir_size(path):
+    total = 0
+    for dir_path, _, file_names in os.walk(path):
+        for file_name in file_names:
+            try:
+                total += os.path.getsize(os.path.join(dir_path, file_name))
+            except OSError:
+                pass
+    return total
+
+
+class MirrorCache:
+    """
+    Persistent cache of bare, blobless partial clones keyed by normalized
+    repository URL. A repository is cloned once; later runs only fetch new
+    refs, and blobs are downloaded lazily when a file is read. The least
+    recently used mirrors are evicted when the cache grows over max_bytes.
+
+    Within one process a repository is only cloned or fetched once, however
+    many packages share it. The index isn't shared between processes, so
+    concurrent processes (e.g. shards) need their own cache_dir.
+
+    Mirrors being probed are leased (see acquire/release) and never evicted
+    while leased; their size is measured again on release, as reading files
+    downloads blobs. With ephemeral, a mirror is deleted as soon as the last
+    expected package of its repository released it (see expect), so a run
+    only needs disk for the repositories in flight.
+    """
+
+    def __init__(self, cache_dir=MIRROR_CACHE_DIR, max_bytes=MIRROR_CACHE_MAX_BYTES, ephemeral=MIRROR_CACHE_EPHEMERAL):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ephemeral = ephemeral
+        self.index_path = os.path.join(cache_dir, 'index.json')
+        self.stats = {
+            "hits": 0, "misses": 0, "failures": 0, "evictions": 0, "removed": 0, "bytes_fetched": 0, "peak_bytes": 0
+        }
+        self._lock = threading.Lock()
+        self._repo_locks = {}
+        self._refreshed = set()
+        self._failed = set()
+        self._leases = {}
+        self._expected = {}
+        os.makedirs(cache_dir, exist_ok=True)
+        self._index = self._load_index()
+        self._remove_orphans()
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, 'r') as index_file:
+                return json.load(index_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _remove_orphans(self):
+        # Deletes mirrors left behind by runs killed while cloning
+        indexed_paths = {entry['path'] for entry in self._index.values()}
+        for file_name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, file_name)
+            if file_name.endswith('.git') and path not in indexed_paths:
+                if time.time() - os.path.getmtime(path) > ORPHAN_MAX_AGE:
+                    print(f"Removing orphaned mirror {path}")
+                    shutil.rmtree(path, ignore_errors=True)
+
+    def _save_index(self):
+        temp_path = self.index_path + '.tmp'
+        with open(temp_path, 'w') as index_file:
+            json.dump(self._index, index_file, indent=2)
+        os.replace(temp_path, self.index_path)
+
+    def _repo_lock(self, key):
+        with self._lock:
+            return self._repo_locks.setdefault(key, threading.Lock())
+
+    def mirror_path(self, repo_url):
+        normalized_url = normalize_repo_url(repo_url)
+        key = hashlib.sha1(normalized_url.encode('utf-8')).hexdigest()[:16]
+        slug = re.sub(r'[^a-z0-9._-]+', '-', normalized_url.split('/', 3)[-1].lower()).strip('-')
+        return key, os.path.join(self.cache_dir, f"{slug}-{key}.git")
+
+    def _clone(self, repo_url, path):
+        get_metrics().increment('git_subprocesses', 2)
+
+        def clone():
+            # A failed attempt may leave a partial clone behind
+            shutil.rmtree(path, ignore_errors=True)
+            subprocess.run(
+                ['git', 'clone', '--quiet', '--bare', '--filter=blob:none', repo_url, path],
+                check=True, capture_output=True, text=True
+            )
+
+        with get_metrics().span('clone'):
+            get_request_scheduler().run_git(repo_url, clone)
+            # Keep branches and tags up to date on later fetches
+            subprocess.run(
+                ['git', 'config', 'remote.origin.fetch', '+refs/heads/*:refs/heads/*'],
+                cwd=path, check=True
+            )
+
+    def _fetch(self, repo_url, path):
+        get_metrics().increment('git_subprocesses')
+        with get_metrics().span('fetch_tags'):
+            get_request_scheduler().run_git(repo_url, lambda: subprocess.run(
+                ['git', 'fetch', '--prune', '--tags', 'origin'],
+                cwd=path, check=True, capture_output=True, text=True
+            ))
+
+    def get(self, repo_url):
+        """
+        Returns the path of an up to date mirror of repo_url, or None if the
+        repository can't be cloned.
+        """
+        key, path = self.mirror_path(repo_url)
+        with self._repo_lock(key):
+            if key in self._failed:
+                self._record('failures')
+                return None
+            size_before = get_dir_size(path) if os.path.exists(path) else 0
+            if size_before and key in self._refreshed:
+                # Already brought up to date for another package of the repository
+                self._record('hits')
+            elif size_before:
+                try:
+                    self._fetch(repo_url, path)
+                except subprocess.CalledProcessError as e:
+                    # A stale mirror is still better than no mirror
+                    print(f"Error fetching {repo_url} into cache: {e} {e.stderr or ''}")
+                self._record('hits')
+            else:
+                try:
+                    self._clone(repo_url, path)
+                except subprocess.CalledProcessError as e:
+                    print(f"Error cloning repository: {e} {e.stderr or ''}")
+                    shutil.rmtree(path, ignore_errors=True)
+                    self._failed.add(key)
+                    self._record('failures')
+                    return None
+                self._record('misses')
+            self._refreshed.add(key)
+            size_after = get_dir_size(path)
+
+        get_metrics().increment('git_bytes_fetched', max(size_after - size_before, 0))
+        with self._lock:
+            self.stats['bytes_fetched'] += max(size_after - size_before, 0)
+            self._index[key] = {
+                "url": normalize_repo_url(repo_url),
+                "path": path,
+                "size": size_after,
+                "last_used": time.time()
+            }
+            self._evict(keep=key)
+            self._update_peak()
+            self._save_index()
+        print(f"Repository mirrored at: {path}")
+        return path
+
+    def expect(self, repo_urls):
+        # Registers how many packages of each repository will acquire it this run
+        with self._lock:
+            for repo_url in repo_urls:
+                key = self.mirror_path(repo_url)[0]
+                self._expected[key] = self._expected.get(key, 0) + 1
+
+    def acquire(self, repo_url):
+        """
+        Like get, and leases the mirror until release(repo_url) is called so
+        that it isn't evicted while in use.
+        """
+        key = self.mirror_path(repo_url)[0]
+        with self._lock:
+            self._leases[key] = self._leases.get(key, 0) + 1
+        path = self.get(repo_url)
+        if path is None:
+            self.release(repo_url)
+        return path
+
+    def release(self, repo_url):
+        key, path = self.mirror_path(repo_url)
+        with self._repo_lock(key):
+            with self._lock:
+                self._leases[key] = self._leases.get(key, 1) - 1
+                if self._leases[key] <= 0:
+                    del self._leases[key]
+            if self._drop_expectation(key, path) or key not in self._index:
+                return
+            size = get_dir_size(path)
+            with self._lock:
+                self._index[key]['size'] = size
+                self._update_peak()
+                self._evict()
+                self._save_index()
+
+    def done(self, repo_url):
+        # A package expected to acquire the mirror no longer needs it, e.g. answered from the support table
+        key, path = self.mirror_path(repo_url)
+        with self._repo_lock(key):
+            self._drop_expectation(key, path)
+
+    def _drop_expectation(self, key, path):
+        # Deletes an ephemeral mirror once nothing needs it any more, returns whether it was deleted
+        with self._lock:
+            if key in self._expected:
+                self._expected[key] = max(self._expected[key] - 1, 0)
+            in_use = self._leases.get(key, 0) > 0 or self._expected.get(key, 0) > 0
+        if not self.ephemeral or in_use or key not in self._index:
+            return False
+        shutil.rmtree(path, ignore_errors=True)
+        with self._lock:
+            del self._index[key]
+            self._refreshed.discard(key)
+            self.stats['removed'] += 1
+            self._save_index()
+        return True
+
+    def close(self):
+        # An ephemeral cache doesn't outlive the run, even for packages skipped without a release
+        if not self.ephemeral:
+            return
+        with self._lock:
+            for key, entry in list(self._index.items()):
+                if not self._leases.get(key):
+                    shutil.rmtree(entry['path'], ignore_errors=True)
+                    del self._index[key]
+                    self.stats['removed'] += 1
+            self._save_index()
+
+    def _update_peak(self):
+        total_size = sum(entry['size'] for entry in self._index.values())
+        self.stats['peak_bytes'] = max(self.stats['peak_bytes'], total_size)
+
+    def _record(self, stat):
+        get_metrics().increment(f"mirror_cache_{stat}")
+        with self._lock:
+            self.stats[stat] += 1
+
+    def _evict(self, keep=None):
+        # Remove least recently used mirrors until the cache fits max_bytes, leased ones are kept
+        total_size = sum(entry['size'] for entry in self._index.values())
+        for key, entry in sorted(self._index.items(), key=lambda item: item[1]['last_used']):
+            if total_size <= self.max_bytes:
+                break
+            if key == keep or self._leases.get(key):
+                continue
+            shutil.rmtree(entry['path'], ignore_errors=True)
+            total_size -= entry['size']
+            del self._index[key]
+            self.stats['evictions'] += 1
+
+    def total_size(self):
+        with self._lock:
+            return sum(entry['size'] for entry in self._index.values())
+
+    def report(self):
+        stats = dict(self.stats)
+        stats['mirrors'] = len(self._index)
+        stats['leased'] = len(self._leases)
+        stats['total_size'] = self.total_size()
+        return stats
+
+
+_mirror_cache = None
+
+
+def get_mirror_cache(cache_dir=MIRROR_CACHE_DIR):
+    # cache_dir only applies to the first call, which creates the cache of the process
+    global _mirror_cache
+    if _mirror_cache is None:
+        _mirror_cache = MirrorCache(cache_dir)
+    return _mirror_cache
@@ -0,0 +1,161 @@
+import os
+import re
+import threading
+
+import toml
+from packaging.specifiers import InvalidSpecifier, SpecifierSet
+
+from facts_cache import FactsCache
+from git_metadata import PACKAGING_FILES, get_metadata_reader
+
+# Bump whenever extract_file_facts changes, to invalidate cached facts
+FACTS_EXTRACTOR_VERSION = 1
+
+DJANGO_CLASSIFIER_RE = re.compile(r"Framework :: Django :: (\d+(?:\.\d+)*)")
+PYTHON_CLASSIFIER_RE = re.compile(r"Programming Language :: Python :: (\d+\.\d+)")
+# Django requirement in install_requires, setup.cfg options or pyproject dependencies
+DJANGO_REQUIREMENT_RE = re.compile(
+    r"(?<![\w.-])[Dd]jango(?![\w.-])\s*(?:\[[^\]]*\])?\s*((?:[<>=!~]=?=?\s*[\w.*+!-]+\s*,?\s*)+)"
+)
+SETUP_PY_PYTHON_REQUIRES_RE = re.compile(r"python_requires\s*=\s*['\"]([^'\"]+)['\"]")
+SETUP_CFG_PYTHON_REQUIRES_RE = re.compile(r"^\s*python_requires\s*=\s*(.+?)\s*$", re.MULTILINE)
+
+
+def empty_facts():
+    return {"django": [], "python": [], "requires_python": [], "django_requirements": []}
+
+
+def extract_file_facts(file_name, content):
+    """
+    Extracts everything a packaging file declares about Django and Python
+    support in a single read of its content.
+
+    file_name: setup.py, setup.cfg or pyproject.toml
+    content: text of the file
+    Returns a dict with the Django and Python versions named in classifiers,
+    the python_requires/requires-python specifiers and the Django
+    requirement specifiers, as sorted lists.
+    """
+    facts = empty_facts()
+    if not content:
+        return facts
+
+    if file_name == 'pyproject.toml':
+        try:
+            project = toml.loads(content).get('project', {})
+        except toml.TomlDecodeError:
+            return facts  # Invalid TOML format
+        text = '\n'.join(project.get('classifiers', []) + project.get('dependencies', []))
+        if isinstance(project.get('requires-python'), str):
+            facts['requires_python'].append(project['requires-python'])
+    else:
+        text = content
+        python_requires_re = SETUP_PY_PYTHON_REQUIRES_RE if file_name == 'setup.py' else SETUP_CFG_PYTHON_REQUIRES_RE
+        facts['requires_python'] = python_requires_re.findall(content)
+
+    facts['django'] = DJANGO_CLASSIFIER_RE.findall(text)
+    facts['python'] = PYTHON_CLASSIFIER_RE.findall(text)
+    facts['django_requirements'] = [
+        re.sub(r"\s+", "", specifier).rstrip(',') for specifier in DJANGO_REQUIREMENT_RE.findall(text)
+    ]
+    return {key: sorted(set(values)) for key, values in facts.items()}
+
+
+def merge_facts(facts_list):
+    merged = empty_facts()
+    for facts in facts_list:
+        for key in merged:
+            merged[key].extend(facts.get(key, []))
+    return {key: sorted(set(values)) for key, values in merged.items()}
+
+
+_facts_cache = None
+_facts_cache_lock = threading.Lock()
+
+
+def get_facts_cache():
+    global _facts_cache
+    with _facts_cache_lock:
+        if _facts_cache is None:
+            _facts_cache = FactsCache(extractor_version=FACTS_EXTRACTOR_VERSION)
+        return _facts_cache
+
+
+def get_package_facts(repo_dir, ref, subdir=None):
+    """
+    Facts declared by setup.py, setup.cfg and pyproject.toml at ref, in
+    subdir for a package living in a subdirectory of a monorepo.
+
+    Only the blob ids of the files are resolved for every ref; a file is
+    read and parsed only when its blob isn't in the facts cache yet.
+    """
+    reader = get_metadata_reader(repo_dir)
+    return get_facts_of_blobs(
+        reader.read_blob_ids(ref, packaging_file_paths(subdir)),
+        lambda blob_ids: {blob_id: reader.read_object(blob_id) for blob_id in blob_ids}
+    )
+
+
+def packaging_file_paths(subdir=None):
+    return [f"{subdir.strip('/')}/{file_name}" for file_name in PACKAGING_FILES] if subdir else PACKAGING_FILES
+
+
+def get_facts_of_blobs(blob_ids, read_blobs):
+    """
+    Merged facts of packaging files given by blob id, going through the
+    facts cache.
+
+    blob_ids: dict mapping packaging file paths to blob ids (None if missing)
+    read_blobs: callable taking the list of blob ids missing from the
+        cache and returning a dict of their contents, so that sources able
+        to batch reads fetch them all at once
+    """
+    facts_cache = get_facts_cache()
+    facts_by_path, missing = {}, {}
+    for path, blob_id in blob_ids.items():
+        if blob_id is None:
+            continue
+        facts_by_path[path] = facts_cache.get(blob_id, os.path.basename(path))
+        if facts_by_path[path] is None:
+            missing[path] = blob_id
+    if missing:
+        contents = read_blobs(list(missing.values()))
+        for path, blob_id in missing.items():
+            file_name = os.path.basename(path)
+            facts_by_path[path] = extract_file_facts(file_name, contents.get(blob_id))
+            facts_cache.put(blob_id, file_name, facts_by_path[path])
+    return merge_facts(list(facts_by_path.values()))
+
+
+def _specifiers_allow(specifiers, version):
+    # A minor version is allowed if its first or a late patch release matches
+    for specifier in specifiers:
+        try:
+            specifier_set = SpecifierSet(specifier)
+        except InvalidSpecifier:
+            continue
+        if not any(specifier_set.contains(f"{version}.{patch}", prereleases=True) for patch in (0, 99)):
+            return False
+    return True
+
+
+def supports_version(facts, version_type, version):
+    """
+    version_type: django or python
+    version: version to look for, e.g. 4.2 or 3.11
+
+    A version is supported when a classifier names it (or, for Django, an
+    exact Django==X.Y pin), unless python_requires/requires-python or a
+    Django requirement specifier excludes it.
+    """
+    if version_type == "python":
+        return version in facts['python'] and _specifiers_allow(facts['requires_python'], version)
+    elif version_type == "django":
+        pinned = any(
+            re.match(rf"==\s*{re.escape(version)}(\.|$|,)", specifier)
+            for specifier in facts['django_requirements']
+        )
+        return (version in facts['django'] or pinned) and _specifiers_allow(
+            [specifier for specifier in facts['django_requirements'] if not specifier.startswith('==')], version
+        )
+    return False
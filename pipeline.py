@@ -0,0 +1,124 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from metrics import get_metrics
+
+
+class ResultsWriter:
+    """
+    Serializes result writes through a single thread, so lines written by
+    concurrent workers never interleave.
+
+    save: callable that persists one results dict (e.g. main.save_update)
+    """
+
+    def __init__(self, save):
+        self.save = save
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='results-writer', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            results = self._queue.get()
+            if results is None:
+                break
+            try:
+                self.save(results)
+            except Exception as ex:
+                print(f"Failed to save results {list(results)}: {ex}")
+
+    def write(self, results):
+        self._queue.put(results)
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ProgressReporter:
+    # Prints per-worker progress for a run of `total` dependencies
+
+    def __init__(self, total):
+        self.total = total
+        self.done = 0
+        self.started_at = time.monotonic()
+        self._per_worker = {}
+        self._lock = threading.Lock()
+
+    def started(self, dependency_name):
+        worker = threading.current_thread().name
+        print(f"[{worker}] started {dependency_name}")
+
+    def finished(self, dependency_name, elapsed):
+        worker = threading.current_thread().name
+        with self._lock:
+            self.done += 1
+            self._per_worker[worker] = self._per_worker.get(worker, 0) + 1
+            done, worker_done = self.done, self._per_worker[worker]
+        print(
+            f"[{worker}] finished {dependency_name} in {elapsed:.1f}s "
+            f"({worker_done} by this worker, {done}/{self.total} overall, "
+            f"{time.monotonic() - self.started_at:.0f}s elapsed)"
+        )
+
+    def summary(self):
+        with self._lock:
+            return dict(self._per_worker)
+
+
+def group_dependencies(dependencies, group_key):
+    # Lists of dependencies sharing a group_key, in order of first appearance
+    groups = {}
+    for dependency in dependencies:
+        groups.setdefault(group_key(dependency), []).append(dependency)
+    return list(groups.values())
+
+
+def run_pipeline(dependencies, analyze, save, workers=1, group_key=None):
+    """
+    Runs analyze over every dependency on a bounded pool of worker threads.
+    The clone and probe stages are subprocess bound, so threads keep every
+    core busy without the cost of pickling results between processes.
+
+    dependencies: list of dicts with 'dependency' and 'source' keys
+    analyze: callable taking one dependency dict and returning its results
+    save: callable persisting one results dict, called from a single thread
+    workers: maximum number of dependencies analyzed at the same time
+    group_key: optional callable; dependencies with the same key (e.g. the
+        same repository) are analyzed one after the other by one worker
+    """
+    progress = ProgressReporter(len(dependencies))
+    groups = group_dependencies(dependencies, group_key) if group_key else [[dependency] for dependency in dependencies]
+    if len(groups) < len(dependencies):
+        print(f"{len(dependencies)} dependencies share {len(groups)} repositories")
+
+    def work(group, writer):
+        for dependency in group:
+            progress.started(dependency['dependency'])
+            started_at = time.monotonic()
+            try:
+                # Spans and counters recorded while analyzing are attributed to the dependency
+                with get_metrics().dependency(dependency['dependency']), get_metrics().span('analyze'):
+                    results = analyze(dependency)
+            except Exception as ex:
+                print(f"Failed to analyze {dependency['dependency']}: {ex}")
+                continue
+            progress.finished(dependency['dependency'], time.monotonic() - started_at)
+            if results:
+                writer.write(results)
+
+    with ResultsWriter(save) as writer:
+        with ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix='worker') as executor:
+            for future in as_completed([executor.submit(work, group, writer) for group in groups]):
+                future.result()
+
+    print(f"Analyzed {progress.done}/{len(dependencies)} dependencies, per worker: {progress.summary()}")
@@ -0,0 +1,242 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from constants import PYPI_BASE_URL
+from http_cache import get_http_cache
+from metrics import get_metrics
+from rate_limits import get_request_scheduler
+from source_urls import filter_urls
+
+REQUEST_TIMEOUT = 30
+# Start of the link recorded when pages could not be fetched, worth resolving again later
+FAILED_LINK_PREFIX = "Failed to retrieve the webpage"
+# Project URL labels that usually point at the source code
+SOURCE_LINK_LABELS = ['source', 'repository', 'code', 'github', 'gitlab']
+
+
+def create_session(pool_size=16):
+    # Keep-alive connection pool shared by every request of a scraper
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def extract_project_links(html):
+    """
+    Returns the source code link found in the "Project links" sidebar of a
+    PyPI project page, "No Github Link" if the sidebar has no source link, or
+    None if the page has no "Project links" sidebar at all.
+    """
+    # Only pages without a JSON source link are parsed, bs4 is imported on first use
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, 'html.parser')
+    project_links_section = soup.find('h3', {'class': 'sidebar-section__title'}, string='Project links')
+    if not project_links_section:
+        return None
+    parent_div = project_links_section.find_parent('div', {'class': 'sidebar-section'})
+    link_elements = parent_div.find('ul', {'class': 'vertical-tabs__list'}).find_all('a')
+    links = list(set(filter_urls([link['href'] for link in link_elements])))
+    return links[0] if links else "No Github Link"
+
+
+def extract_json_source_link(metadata):
+    """
+    Returns the source code link found in the JSON metadata of a PyPI
+    project (`/pypi/<name>/json`), or None if it has none.
+
+    Source/repository labelled project URLs are preferred over the other
+    project URLs and the home page.
+    """
+    info = metadata.get('info') or {}
+    project_urls = info.get('project_urls') or {}
+    ranked_urls = sorted(
+        project_urls.items(),
+        key=lambda item: not any(label in item[0].lower() for label in SOURCE_LINK_LABELS)
+    )
+    candidate_urls = [url for _, url in ranked_urls if url]
+    if info.get('home_page'):
+        candidate_urls.append(info['home_page'])
+    links = filter_urls(candidate_urls)
+    return links[0] if links else None
+
+
+def extract_release_versions(html, limit=10):
+    # Latest `limit` versions listed in the release history of a project page
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, 'html.parser')
+    return [
+        p.text.split('\n')[0].strip() if '\n' in p.text else p.text.strip()
+        for p in soup.find_all('p', {'class': 'release__version'})
+    ][:limit]
+
+
+def is_not_found(error):
+    response = getattr(error, 'response', None)
+    return isinstance(error, requests.HTTPError) and response is not None and response.status_code == 404
+
+
+class AsyncPyPIScraper:
+    """
+    Resolves source code links of many PyPI projects concurrently.
+
+    Requests share one keep-alive connection pool and run on a thread pool
+    of `concurrency` threads; at most `concurrency` requests are in flight
+    overall, at most `per_host_limit` per host, and
+    requests to one host start at least `per_host_delay` seconds apart.
+
+    With use_json_api the small JSON metadata of a project is tried first
+    and HTML pages are only scraped when it has no source code link. With
+    use_http_cache responses are revalidated against the shared HTTPCache.
+    """
+
+    def __init__(self, base_url=None, concurrency=16, per_host_limit=8, per_host_delay=0.0, session=None,
+                 use_json_api=True, use_http_cache=True):
+        # Looked up at call time so that benchmarks can point it at a local server
+        self.base_url = (base_url or PYPI_BASE_URL).rstrip('/')
+        self.http_cache = get_http_cache() if use_http_cache else None
+        self.use_json_api = use_json_api
+        self.concurrency = concurrency
+        self.per_host_limit = per_host_limit
+        self.per_host_delay = per_host_delay
+        self.session = session or create_session(concurrency)
+        # Blocking requests run here, asyncio's default executor would cap them at min(32, cpus + 4)
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='pypi')
+        self._semaphore = None
+        self._host_semaphores = {}
+        self._host_next_start = {}
+
+    def _host_semaphore(self, host):
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(self.per_host_limit)
+        return self._host_semaphores[host]
+
+    async def _wait_for_host_turn(self, host):
+        now = time.monotonic()
+        start_at = max(now, self._host_next_start.get(host, now))
+        self._host_next_start[host] = start_at + self.per_host_delay
+        if start_at > now:
+            await asyncio.sleep(start_at - now)
+
+    async def fetch(self, url):
+        """
+        Returns the body of url as text, raises requests.RequestException on
+        failure.
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        host = urlsplit(url).netloc
+        async with self._semaphore, self._host_semaphore(host):
+            await self._wait_for_host_turn(host)
+            if self.http_cache:
+                content = await self._run_blocking(self.http_cache.get_content, url, self.session)
+                return content.decode('utf-8', errors='replace')
+            response = await self._run_blocking(self._get, url)
+            response.raise_for_status()
+            return response.text
+
+    async def _run_blocking(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    def _get(self, url):
+        get_metrics().increment('http_requests')
+        with get_metrics().span('http'):
+            response = get_request_scheduler().get(self.session, url, timeout=REQUEST_TIMEOUT)
+        get_metrics().increment('http_bytes_fetched', len(response.content))
+        return response
+
+    async def resolve_from_json(self, dependency_name):
+        """
+        Returns the source code link from the JSON metadata of a project, or
+        None if the metadata can't be fetched or has no source code link.
+        Raises requests.HTTPError if the project doesn't exist.
+        """
+        url = f"{self.base_url}/pypi/{dependency_name}/json"
+        try:
+            metadata = json.loads(await self.fetch(url))
+        except (requests.RequestException, ValueError) as e:
+            if is_not_found(e):
+                raise
+            print(f"Failed to retrieve JSON metadata from {url}, falling back to HTML. Exception: {e}")
+            return None
+        return extract_json_source_link(metadata)
+
+    async def scrape_source_code_url(self, dependency_name):
+        if self.use_json_api:
+            try:
+                link = await self.resolve_from_json(dependency_name)
+            except requests.HTTPError as e:
+                # The HTML pages of a project missing from the JSON API are missing too
+                print(f"Project {dependency_name} not found on PyPI. Exception: {e}")
+                return f"{FAILED_LINK_PREFIX} for {self.base_url}/project/{dependency_name}/"
+            if link:
+                return link
+        return await self.scrape_html_source_code_url(dependency_name)
+
+    async def scrape_html_source_code_url(self, dependency_name):
+        url = f"{self.base_url}/project/{dependency_name}/"
+
+        try:
+            project_page = await self.fetch(url)
+
+            # Step 1: Check for Project Links Tab
+            link = extract_project_links(project_page)
+            if link:
+                return link
+
+            # Step 2: If Project Links Tab is not found, get up to 10 latest
+            # versions from the release history, which is part of the
+            # project page already fetched
+            release_versions = extract_release_versions(project_page)
+
+            # Step 3: Fetch the version pages concurrently and take the
+            # newest one having Project Links
+            version_pages = await asyncio.gather(*[
+                self.fetch(f"{self.base_url}/project/{dependency_name}/{version}")
+                for version in release_versions
+            ])
+            for version_page in version_pages:
+                link = extract_project_links(version_page)
+                if link:
+                    return link
+
+            # If Project Links are not found in any version, return the appropriate message
+            return "No Github Link in Release History"
+
+        except requests.RequestException as e:
+            print(f"Failed to retrieve the webpage for {url}. Exception: {e}")
+            return f"{FAILED_LINK_PREFIX} for {url}"
+
+    async def scrape_source_code_urls(self, dependency_names):
+        links = await asyncio.gather(*[self.scrape_source_code_url(name) for name in dependency_names])
+        return dict(zip(dependency_names, links))
+
+    def close(self):
+        self._executor.shutdown()
+        self.session.close()
+
+
+def is_failed_link(link):
+    # Whether a resolved link is a failure to fetch (e.g. still throttled after the retries)
+    return bool(link) and link.startswith(FAILED_LINK_PREFIX)
+
+
+def scrape_source_code_urls(dependency_names, **scraper_options):
+    """
+    Resolves the source code links of all dependency_names concurrently.
+    Returns a dict mapping each dependency name to its link or failure message.
+
+    scraper_options: passed to AsyncPyPIScraper (base_url, concurrency, ...)
+    """
+    scraper = AsyncPyPIScraper(**scraper_options)
+    try:
+        return asyncio.run(scraper.scrape_source_code_urls(list(dependency_names)))
+    finally:
+        scraper.close()
@@ -0,0 +1,268 @@
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+
+from constants import (
+    DEFAULT_HOST_BURST,
+    DEFAULT_HOST_CONCURRENCY,
+    DEFAULT_HOST_RATE,
+    HOST_RATE_LIMITS,
+    MAX_REQUEST_ATTEMPTS
+)
+from metrics import get_metrics
+
+THROTTLED_STATUSES = [429, 503]
+RETRYABLE_STATUSES = [429, 500, 502, 503, 504]
+# Longest wait honoured from a Retry-After header
+MAX_RETRY_AFTER = 300
+# git stderr of failures that are worth retrying, unlike missing or private repositories
+TRANSIENT_GIT_ERROR_RE = re.compile(
+    r"429|rate limit|timed out|could not resolve host|connection (reset|refused|timed out)|"
+    r"early eof|remote end hung up|the requested url returned error: 5\d\d|"
+    # Dropped TLS connections, not certificate verification failures
+    r"gnutls_handshake|gnutls_record_recv|ssl_read|ssl_connect|ssl_error_syscall|unexpected eof",
+    re.IGNORECASE
+)
+
+
+def parse_retry_after(value):
+    # Seconds to wait from a Retry-After header (delta seconds or HTTP date), or None
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+
+
+def backoff_delay(attempt, base=0.5, cap=60.0):
+    # Full jitter exponential backoff: uniform in [0, min(cap, base * 2^attempt)]
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def is_transient_git_error(stderr):
+    return bool(stderr and TRANSIENT_GIT_ERROR_RE.search(stderr))
+
+
+class TokenBucket:
+    # Allows `rate` operations per second on average, with bursts of up to `burst`
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        # Blocks until a token is available, returns the seconds waited
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+class HostLimiter:
+    """
+    Rate and concurrency limits of one host.
+
+    Requests take a token from the host's bucket and one of `limit`
+    concurrent slots. The limit grows by one after a full window of fast,
+    successful requests and is halved when the host throttles or answers
+    slowly (additive increase, multiplicative decrease). A Retry-After
+    answer pauses every request to the host until it expires.
+    """
+
+    def __init__(self, host, rate, burst, concurrency, slow_seconds=10.0):
+        self.host = host
+        self.bucket = TokenBucket(rate, burst)
+        self.max_limit = concurrency
+        self.limit = concurrency
+        self.slow_seconds = slow_seconds
+        self.stats = {"requests": 0, "throttled": 0, "retries": 0, "errors": 0}
+        self._in_flight = 0
+        self._successes = 0
+        self._paused_until = 0.0
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def slot(self):
+        with self._condition:
+            while self._in_flight >= self.limit or time.monotonic() < self._paused_until:
+                self._condition.wait(timeout=max(self._paused_until - time.monotonic(), 0.05))
+            self._in_flight += 1
+        try:
+            waited = self.bucket.acquire()
+            if waited:
+                get_metrics().increment('rate_limit_wait_ms', int(waited * 1000))
+            yield
+        finally:
+            with self._condition:
+                self._in_flight -= 1
+                self._condition.notify_all()
+
+    def on_success(self, latency=None):
+        # latency: seconds of the request, None when its duration says nothing about the host's load
+        with self._condition:
+            self.stats['requests'] += 1
+            if latency is not None and latency > self.slow_seconds:
+                self._decrease()
+                return
+            self._successes += 1
+            if self._successes >= self.limit and self.limit < self.max_limit:
+                self.limit += 1
+                self._successes = 0
+                self._condition.notify_all()
+
+    def on_throttle(self, retry_after=None):
+        with self._condition:
+            self.stats['throttled'] += 1
+            self._decrease()
+            if retry_after:
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+        get_metrics().increment('http_throttled')
+
+    def on_error(self):
+        with self._condition:
+            self.stats['errors'] += 1
+            self._decrease()
+
+    def on_retry(self, metric='http_retries'):
+        with self._condition:
+            self.stats['retries'] += 1
+        get_metrics().increment(metric)
+
+    def _decrease(self):
+        self.limit = max(1, self.limit // 2)
+        self._successes = 0
+
+
+class RequestScheduler:
+    """
+    Shared scheduler of requests to remote hosts: per-host token buckets and
+    adaptive concurrency (see HostLimiter), Retry-After handling and
+    jittered exponential backoff of transient failures. Thread-safe, meant
+    to be called from worker threads.
+    """
+
+    def __init__(self, host_limits=None, max_attempts=MAX_REQUEST_ATTEMPTS):
+        self.host_limits = dict(HOST_RATE_LIMITS if host_limits is None else host_limits)
+        self.max_attempts = max_attempts
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def limiter(self, host):
+        with self._lock:
+            if host not in self._limiters:
+                rate, burst, concurrency = self.host_limits.get(
+                    host, (DEFAULT_HOST_RATE, DEFAULT_HOST_BURST, DEFAULT_HOST_CONCURRENCY)
+                )
+                self._limiters[host] = HostLimiter(host, rate, burst, concurrency)
+            return self._limiters[host]
+
+    def get(self, session, url, **request_options):
+        return self.request(session, 'GET', url, **request_options)
+
+    def request(self, session, method, url, **request_options):
+        """
+        session.request(method, url) within the limits of its host. 429/5xx
+        answers and connection errors are retried; the last response is
+        returned (or the last exception raised) once max_attempts are used up.
+        """
+        limiter = self.limiter(urlsplit(url).netloc)
+        for attempt in range(self.max_attempts):
+            last_attempt = attempt == self.max_attempts - 1
+            with limiter.slot():
+                started_at = time.monotonic()
+                try:
+                    response = session.request(method, url, **request_options)
+                except (requests.ConnectionError, requests.Timeout):
+                    limiter.on_error()
+                    if last_attempt:
+                        raise
+                    response = None
+                latency = time.monotonic() - started_at
+            if response is not None and response.status_code not in RETRYABLE_STATUSES:
+                limiter.on_success(latency)
+                return response
+            if response is not None:
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                if response.status_code in THROTTLED_STATUSES:
+                    limiter.on_throttle(retry_after)
+                else:
+                    limiter.on_error()
+                if last_attempt:
+                    return response
+                response.close()
+            else:
+                retry_after = None
+            limiter.on_retry()
+            # The pause of the host already covers Retry-After, a jittered delay spreads the retries
+            time.sleep(backoff_delay(attempt) if retry_after is None else random.uniform(0, 0.5))
+
+    def run_git(self, url, run):
+        """
+        Calls run() (a git command against url, raising
+        subprocess.CalledProcessError with its stderr) within the limits of
+        the url's host, retrying transient failures with backoff.
+        """
+        limiter = self.limiter(urlsplit(url).netloc or 'local')
+        for attempt in range(self.max_attempts):
+            with limiter.slot():
+                try:
+                    result = run()
+                except Exception as e:
+                    stderr = getattr(e, 'stderr', None)
+                    if isinstance(stderr, bytes):
+                        stderr = stderr.decode('utf-8', errors='replace')
+                    if not is_transient_git_error(stderr) or attempt == self.max_attempts - 1:
+                        raise
+                    if '429' in stderr or 'rate limit' in stderr.lower():
+                        limiter.on_throttle()
+                    else:
+                        limiter.on_error()
+                    print(f"Transient git failure for {url}, retrying: {stderr.strip()}")
+                    limiter.on_retry('git_retries')
+                    delay = backoff_delay(attempt, base=2.0)
+                else:
+                    # A clone or fetch takes as long as the repository is big, not a throttling signal
+                    limiter.on_success()
+                    return result
+            time.sleep(delay)
+
+    def report(self):
+        with self._lock:
+            return {
+                host: dict(limiter.stats, limit=limiter.limit)
+                for host, limiter in self._limiters.items()
+            }
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_request_scheduler():
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RequestScheduler()
+        return _scheduler
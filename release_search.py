@@ -0,0 +1,93 @@
+def _sample_indexes(start, end, count):
+    # Evenly spaced indexes strictly between start and end
+    span = end - start
+    if span <= 1 or count <= 0:
+        return []
+    # start + span * k / (count + 1) rounded to the nearest index
+    indexes = [start + (2 * span * k + count + 1) // (2 * (count + 1)) for k in range(1, count + 1)]
+    return sorted({index for index in indexes if start < index < end})
+
+
+def linear_first_supporting_release(asc_tags, probe):
+    """
+    Walk the tags from newest to oldest and return the oldest tag of the
+    unbroken run of supporting tags that ends at the newest tag.
+
+    asc_tags: release tags sorted from oldest to newest
+    probe: callable taking a tag and returning True if it supports the version
+    """
+    first_supporting_tag = None
+    for tag in reversed(asc_tags):
+        if not probe(tag):
+            break
+        first_supporting_tag = tag
+    return first_supporting_tag
+
+
+def find_first_supporting_release(asc_tags, probe, verify_samples=3):
+    """
+    Find the release that first added support for a version.
+
+    Support is assumed to be monotone (once added it is never dropped), so the
+    tag list is bisected instead of scanned. A few tags inside the supporting
+    range are re-probed afterwards; if any of them does not support the version
+    the results are not monotone and a linear newest-to-oldest scan is used,
+    which gives the same answer as the old per-tag loop.
+
+    asc_tags: release tags sorted from oldest to newest (see get_release_tags)
+    probe: callable taking a tag and returning True if it supports the version
+    verify_samples: number of extra probes used to detect non-monotone results
+
+    Returns None when the newest tag does not support the version.
+    """
+    if not asc_tags:
+        return None
+
+    probed = {}
+
+    def cached_probe(tag):
+        if tag not in probed:
+            probed[tag] = probe(tag)
+        return probed[tag]
+
+    newest = len(asc_tags) - 1
+    if not cached_probe(asc_tags[newest]):
+        return None
+
+    if cached_probe(asc_tags[0]):
+        low, high = -1, 0
+    else:
+        # asc_tags[low] does not support the version, asc_tags[high] does
+        low, high = 0, newest
+        while high - low > 1:
+            middle = (low + high) // 2
+            if cached_probe(asc_tags[middle]):
+                high = middle
+            else:
+                low = middle
+
+    for index in _sample_indexes(high, newest, verify_samples):
+        if not cached_probe(asc_tags[index]):
+            print(f"Non-monotone support detected at {asc_tags[index]}, falling back to linear scan")
+            return linear_first_supporting_release(asc_tags, cached_probe)
+
+    return asc_tags[high]
+
+
+def find_first_supporting_releases(asc_tags, probe, versions, verify_samples=3):
+    """
+    Find the first supporting release of every version in one search.
+
+    asc_tags: release tags sorted from oldest to newest
+    probe: callable taking a tag and a version, returning True if the tag
+        supports the version; it should read the tag's metadata once and
+        answer every version from it (see package_metadata.supports_version)
+    versions: versions to look for, any hashable value passed on to probe
+
+    Returns a dict mapping each version to its first supporting release, or
+    None when the newest tag does not support it.
+    """
+    return {
+        version: find_first_supporting_release(asc_tags, lambda tag: probe(tag, version), verify_samples)
+        for version in versions
+    }
@@ -0,0 +1,135 @@
+import re
+import subprocess
+
+from packaging.version import InvalidVersion, Version
+
+from constants import INCLUDE_PRERELEASE_TAGS, UNPARSABLE_TAGS
+from dashboard_stream import normalize_name
+from metrics import get_metrics
+
+# Optional prefix (package name, "release", ...) and separator, optional v, then the version
+TAG_VERSION_RE = re.compile(r'^(?:(?P<prefix>.*?)[-_/@])?[vV]?(?P<version>\d[^/]*)$')
+# Prefixes that don't name a package
+GENERIC_TAG_PREFIXES = ['release', 'releases', 'rel', 'version', 'tag']
+FOR_EACH_REF_FORMAT = '%(refname:strip=2)%00%(objectname)%00%(*objectname)%00%(tree)%00%(*tree)'
+
+
+def parse_tag(tag):
+    """
+    Splits a tag such as `v1.2.0`, `azure-storage-blob_12.19.0` or
+    `mypkg/v2.0` into its normalized prefix (None if it has none) and PEP
+    440 version. Returns None if the tag isn't a version.
+    """
+    match = TAG_VERSION_RE.match(tag)
+    if not match:
+        return None
+    try:
+        version = Version(match.group('version'))
+    except InvalidVersion:
+        return None
+    prefix = match.group('prefix')
+    prefix = normalize_name(prefix) if prefix else None
+    return (None if prefix in GENERIC_TAG_PREFIXES else prefix), version
+
+
+def list_tag_states(repo_dir):
+    # (tag, commit, tree) of every tag, annotated tags peeled to their commit
+    get_metrics().increment('git_subprocesses')
+    output = subprocess.check_output(
+        ['git', 'for-each-ref', f'--format={FOR_EACH_REF_FORMAT}', 'refs/tags'],
+        cwd=repo_dir, text=True
+    )
+    states = []
+    for line in output.splitlines():
+        tag, object_name, peeled_name, tree, peeled_tree = line.split('\0')
+        states.append((tag, peeled_name or object_name, peeled_tree or tree or peeled_name or object_name))
+    return states
+
+
+def normalize_release_tags(tag_states, package_name=None, latest_tag=None,
+                           include_prereleases=INCLUDE_PRERELEASE_TAGS, unparsable=UNPARSABLE_TAGS):
+    """
+    Turns the tags of a repository into the release states worth probing,
+    oldest first.
+
+    tag_states: (tag, commit, tree) tuples, see list_tag_states
+    package_name: in a monorepo only tags prefixed with this name (or with
+        no package prefix) are kept
+    latest_tag: latest release of the default branch, later versions are dropped
+    include_prereleases: keep alpha/beta/rc/dev tags
+    unparsable: 'drop' or 'fallback', to return every tag in git's version
+        order when none of them is a version
+
+    Consecutive tags pointing at the same tree are collapsed to the oldest,
+    as they can't differ in declared support.
+    Returns (tags, report) where report counts the pruned tags per reason.
+    """
+    report = {"total": len(tag_states), "unparsable": 0, "other_package": 0, "prerelease": 0,
+              "after_latest": 0, "same_state": 0}
+    parsed = []
+    for tag, commit, tree in tag_states:
+        parsed_tag = parse_tag(tag)
+        if parsed_tag is None:
+            report['unparsable'] += 1
+        else:
+            parsed.append((tag, tree) + parsed_tag)
+
+    # Tags of other packages are only told apart when the package has prefixed tags
+    # of its own, or when the repository prefixes its tags with a single other name
+    package_prefix = normalize_name(package_name) if package_name else None
+    prefixes = {prefix for _, _, prefix, _ in parsed if prefix}
+    if package_prefix in prefixes:
+        accepted_prefixes = {None, package_prefix}
+    elif len(prefixes) <= 1:
+        accepted_prefixes = prefixes | {None}
+    else:
+        accepted_prefixes = {None}
+    releases = []
+    for tag, tree, prefix, version in parsed:
+        if prefix not in accepted_prefixes:
+            report['other_package'] += 1
+        elif version.is_prerelease and not include_prereleases:
+            report['prerelease'] += 1
+        else:
+            releases.append((version, tag, tree))
+
+    if not releases and not parsed and unparsable == 'fallback' and tag_states:
+        tags = sorted((tag for tag, _, _ in tag_states), key=_git_version_key)
+        report['unparsable'] = 0
+        if latest_tag in tags:
+            report['after_latest'] = len(tags) - tags.index(latest_tag) - 1
+            tags = tags[:tags.index(latest_tag) + 1]
+        return tags, report
+
+    latest = parse_tag(latest_tag) if latest_tag else None
+    tags = []
+    previous_tree = None
+    for version, tag, tree in sorted(releases):
+        if latest and latest[0] in accepted_prefixes and version > latest[1]:
+            report['after_latest'] += 1
+            continue
+        if tree == previous_tree:
+            report['same_state'] += 1
+            continue
+        tags.append(tag)
+        previous_tree = tree
+    return tags, report
+
+
+def _git_version_key(tag):
+    # Rough equivalent of git's version:refname order
+    return [(0, int(part), '') if part.isdigit() else (1, 0, part) for part in re.split(r'(\d+)', tag) if part]
+
+
+def report_pruning(repo_dir, tags, report):
+    pruned = report['total'] - len(tags)
+    for reason in ['unparsable', 'other_package', 'prerelease', 'after_latest', 'same_state']:
+        get_metrics().increment(f"tags_pruned_{reason}", report[reason])
+    get_metrics().increment('tags_listed', report['total'])
+    if pruned:
+        reasons = ', '.join(
+            f"{report[reason]} {reason.replace('_', ' ')}"
+            for reason in ['unparsable', 'other_package', 'prerelease', 'after_latest', 'same_state']
+            if report[reason]
+        )
+        print(f"Pruned {pruned} of {report['total']} tags of {repo_dir} ({reasons})")
@@ -0,0 +1,434 @@
+"""
+Sources of the tags and packaging files of a dependency's repository.
+
+GitRepoSource reads them from a bare mirror of the repository (see
+mirror_cache), GitHubRepoSource from the GitHub APIs without cloning
+anything: tags through GraphQL (REST without a token) and the packaging
+files of a ref through one batched GraphQL query (raw file URLs without a
+token). Both expose the same methods, so tag listing and probing in
+main.py work on either. RecordedRepoSource puts the support table in
+front of them.
+"""
+import hashlib
+import json
+import threading
+from urllib.parse import quote
+
+import requests
+
+from constants import GITHUB_ACCESS_TOKEN, GITHUB_API_URL, GITHUB_RAW_CONTENT_URL, REPO_SOURCE_BACKEND
+from fingerprints import get_remote_fingerprint, get_run_fingerprint
+from git_metadata import close_metadata_reader, get_default_branch, get_latest_release_tag, get_metadata_reader
+from metrics import get_metrics
+from mirror_cache import get_mirror_cache, normalize_repo_url
+from package_metadata import get_facts_of_blobs, get_package_facts, packaging_file_paths
+from rate_limits import get_request_scheduler
+from release_tags import list_tag_states, parse_tag
+from support_table import get_support_table
+
+REQUEST_TIMEOUT = 30
+# Placeholder of constants.py, not a usable token
+TOKEN_PLACEHOLDER = "PLACE GITHUB TOKEN HERE"
+# Most tags the latest release of the default branch is looked for among, one request each
+LATEST_TAG_CANDIDATES = 3
+TAGS_PAGE_SIZE = 100
+
+TAGS_QUERY = """query($owner: String!, $name: String!, $cursor: String) {
+  repository(owner: $owner, name: $name) {
+    refs(refPrefix: "refs/tags/", first: %d, after: $cursor) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        name
+        target {
+          oid
+          ... on Commit { tree { oid } }
+          ... on Tag { target { oid ... on Commit { tree { oid } } } }
+        }
+      }
+    }
+  }
+}""" % TAGS_PAGE_SIZE
+
+
+class RepoSourceError(Exception):
+    pass
+
+
+def has_github_token(token=GITHUB_ACCESS_TOKEN):
+    return bool(token) and token != TOKEN_PLACEHOLDER
+
+
+def github_repository(repo_url):
+    # (owner, name) of a github.com repository URL, None for other hosts
+    scheme, separator, rest = repo_url.partition('://')
+    parts = rest.rstrip('/').split('/') if separator else []
+    if len(parts) < 3 or parts[0].lower() not in ('github.com', 'www.github.com'):
+        return None
+    name = parts[2][:-len('.git')] if parts[2].endswith('.git') else parts[2]
+    return parts[1], name
+
+
+def uses_github_api(repo_url, backend=None):
+    backend = backend or REPO_SOURCE_BACKEND
+    if backend == 'git' or github_repository(repo_url) is None:
+        return False
+    return backend == 'github-api' or (backend == 'auto' and has_github_token())
+
+
+def open_repo_source(repo_url, backend=None):
+    """
+    Source of the repository at repo_url with the given backend ('git',
+    'github-api' or 'auto', REPO_SOURCE_BACKEND by default), or None if the
+    repository can't be accessed. Sources must be closed once done with.
+    """
+    if uses_github_api(repo_url, backend):
+        return GitHubRepoSource.open(*github_repository(repo_url))
+    return GitRepoSource.open(repo_url)
+
+
+def as_repo_source(repo):
+    # Functions probing a repository take either a source or a local repository path
+    return GitRepoSource(repo) if isinstance(repo, str) else repo
+
+
+class RecordedRepoSource:
+    """
+    Answers from the support table what earlier runs read from a
+    repository, and opens the underlying source (see open_repo_source) only
+    for what wasn't recorded.
+
+    The tags, latest release tag and default branch are reused while the
+    remote fingerprint of the repository is unchanged; the facts of a tag
+    for as long as it points at the same commit, so that after new releases
+    only the new tags are read, and new target versions are mostly answered
+    without reading anything. Branch facts are reused while the
+    fingerprint is unchanged.
+
+    The fingerprint is only taken when needed: from the remote (see
+    get_fingerprint) to check a recorded repository, otherwise from the
+    local mirror when the underlying source has one.
+    """
+
+    def __init__(self, repo_url, open_source, get_fingerprint=None, table=None):
+        self.repo_url = repo_url
+        self.name = repo_url
+        self.key = normalize_repo_url(repo_url)
+        self.table = table or get_support_table()
+        self._open_source = open_source
+        self._get_fingerprint = get_fingerprint or (lambda: None)
+        self._fingerprint_taken = False
+        self._fingerprint = None
+        self._source = None
+        self._tag_commits = None
+        record = self.table.get_repository(self.key)
+        self.recorded = record is not None and record.pop('fingerprint') == self.fingerprint
+        self._values = record if self.recorded else {}
+
+    @property
+    def fingerprint(self):
+        if not self._fingerprint_taken:
+            # A mirror fetched in this run has the refs of the remote, saving the ls-remote round trip
+            local_fingerprint = getattr(self._source, 'local_fingerprint', None)
+            self._fingerprint = local_fingerprint() if local_fingerprint else self._get_fingerprint()
+            self._fingerprint_taken = True
+        return self._fingerprint
+
+    @classmethod
+    def open(cls, repo_url, backend=None):
+        # None if the repository isn't recorded and can't be accessed
+        source = cls(repo_url, lambda: open_repo_source(repo_url, backend), lambda: get_run_fingerprint(repo_url))
+        if not source.recorded:
+            try:
+                source._underlying()
+            except RepoSourceError:
+                return None
+        return source
+
+    def _underlying(self):
+        if self._source is None:
+            self._source = self._open_source()
+            if self._source is None:
+                raise RepoSourceError(f"no access to {self.repo_url}")
+        return self._source
+
+    def _value(self, key, read):
+        if key not in self._values:
+            self._values[key] = read(self._underlying())
+        return self._values[key]
+
+    def tag_states(self):
+        return self._value('tag_states', lambda source: source.tag_states())
+
+    def latest_release_tag(self):
+        return self._value('latest_release_tag', lambda source: source.latest_release_tag())
+
+    def default_branch(self):
+        return self._value('default_branch', lambda source: source.default_branch())
+
+    def _ref_state(self, ref):
+        # Commit of a tag, the fingerprint for other refs (None when it couldn't be taken)
+        if self._tag_commits is None:
+            self._tag_commits = {tag: commit for tag, commit, _ in self.tag_states()}
+        return self._tag_commits.get(ref) or self.fingerprint
+
+    def package_facts(self, ref, subdir=None):
+        state = self._ref_state(ref)
+        facts = self.table.get_facts(self.key, subdir, ref, state) if state else None
+        if facts is None:
+            facts = self._underlying().package_facts(ref, subdir)
+            if state:
+                self.table.record_facts(self.key, subdir, ref, state, facts)
+        return facts
+
+    def read_file(self, ref, path):
+        state = self._ref_state(ref)
+        if state:
+            recorded, content = self.table.get_file(self.key, ref, path, state)
+            if recorded:
+                return content
+        content = self._underlying().read_file(ref, path)
+        if state:
+            self.table.record_file(self.key, ref, path, state, content)
+        return content
+
+    def close(self):
+        if self._source is None:
+            # Answered from the support table, the mirror expected for this package isn't needed
+            get_mirror_cache().done(self.repo_url)
+            return
+        tag_states = self._values.get('tag_states')
+        # Without tags nothing else is looked up, the record is complete anyway
+        complete = tag_states is not None and (
+            not tag_states or ('latest_release_tag' in self._values and 'default_branch' in self._values)
+        )
+        if self.fingerprint and not self.recorded and complete:
+            self.table.record_repository(
+                self.key, self.fingerprint, tag_states,
+                self._values.get('latest_release_tag'), self._values.get('default_branch')
+            )
+        self._source.close()
+
+
+class GitRepoSource:
+    # Reads a local git repository, leased from the mirror cache when opened by URL
+
+    def __init__(self, repo_dir, repo_url=None):
+        self.repo_dir = repo_dir
+        self.repo_url = repo_url
+        self.name = repo_dir
+
+    @classmethod
+    def open(cls, repo_url):
+        # Bare partial clone kept in the persistent mirror cache, leased until close()
+        repo_dir = get_mirror_cache().acquire(repo_url)
+        return cls(repo_dir, repo_url) if repo_dir else None
+
+    def tag_states(self):
+        return list_tag_states(self.repo_dir)
+
+    def latest_release_tag(self):
+        return get_latest_release_tag(self.repo_dir)
+
+    def default_branch(self):
+        return get_default_branch(self.repo_dir)
+
+    def package_facts(self, ref, subdir=None):
+        return get_package_facts(self.repo_dir, ref, subdir)
+
+    def read_file(self, ref, path):
+        return get_metadata_reader(self.repo_dir).read_file(ref, path)
+
+    def local_fingerprint(self):
+        # get_remote_fingerprint of the mirror, the same as the remote's once fetched
+        return get_remote_fingerprint(self.repo_dir)
+
+    def close(self):
+        close_metadata_reader(self.repo_dir)
+        if self.repo_url:
+            get_mirror_cache().release(self.repo_url)
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_github_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            _session.headers['Accept'] = 'application/vnd.github+json'
+        return _session
+
+
+class GitHubRepoSource:
+    """
+    Reads a GitHub repository through its APIs, transferring only the tag
+    list and the packaging files of the probed refs instead of a clone.
+
+    With a token, tags are listed 100 per GraphQL query and the packaging
+    files of a ref are resolved to blob ids in one GraphQL query, the
+    contents of the blobs missing from the facts cache in a second one.
+    Without a token the REST tag list and raw file URLs are used, which
+    don't tell trees apart and need a request per file. Requests go through
+    the shared request scheduler.
+    """
+
+    def __init__(self, owner, name, api_url=None, raw_url=None, token=None, session=None):
+        self.owner = owner
+        self.repo_name = name
+        self.name = f"github.com/{owner}/{name}"
+        # Looked up at call time so that benchmarks can point them at a local server
+        self.api_url = (api_url or GITHUB_API_URL).rstrip('/')
+        self.raw_url = (raw_url or GITHUB_RAW_CONTENT_URL).rstrip('/')
+        self.token = token if token is not None else GITHUB_ACCESS_TOKEN
+        self.session = session or get_github_session()
+        self._repository = None
+        self._tag_states = None
+
+    @classmethod
+    def open(cls, owner, name, **options):
+        source = cls(owner, name, **options)
+        try:
+            source.repository()
+        except RepoSourceError as e:
+            print(f"Error opening {source.name}: {e}")
+            return None
+        return source
+
+    def _request(self, method, url, **options):
+        headers = {"Authorization": f"Bearer {self.token}"} if has_github_token(self.token) else {}
+        get_metrics().increment('http_requests')
+        with get_metrics().span('http'):
+            response = get_request_scheduler().request(
+                self.session, method, url, headers=headers, timeout=REQUEST_TIMEOUT, **options
+            )
+        get_metrics().increment('http_bytes_fetched', len(response.content))
+        return response
+
+    def _get_json(self, path, params=None):
+        response = self._request('GET', f"{self.api_url}{path}", params=params)
+        if response.status_code != 200:
+            raise RepoSourceError(f"GET {path} answered {response.status_code}")
+        return response.json()
+
+    def _graphql(self, query, variables=None):
+        response = self._request('POST', f"{self.api_url}/graphql", json={"query": query, "variables": variables or {}})
+        if response.status_code != 200:
+            raise RepoSourceError(f"GraphQL query answered {response.status_code}")
+        data = response.json()
+        if data.get('errors') or not (data.get('data') or {}).get('repository'):
+            raise RepoSourceError(f"GraphQL query failed: {data.get('errors')}")
+        return data['data']['repository']
+
+    def repository(self):
+        if self._repository is None:
+            self._repository = self._get_json(f"/repos/{self.owner}/{self.repo_name}")
+        return self._repository
+
+    def tag_states(self):
+        # (tag, commit, tree) of every tag, see release_tags.list_tag_states
+        if self._tag_states is None:
+            self._tag_states = self._graphql_tag_states() if has_github_token(self.token) else self._rest_tag_states()
+        return self._tag_states
+
+    def _graphql_tag_states(self):
+        states, cursor = [], None
+        while True:
+            refs = self._graphql(TAGS_QUERY, {"owner": self.owner, "name": self.repo_name, "cursor": cursor})['refs']
+            for node in refs['nodes']:
+                target = node['target']
+                # Annotated tags are peeled to their commit
+                commit = target.get('target') or target
+                states.append((node['name'], commit['oid'], (commit.get('tree') or commit)['oid']))
+            if not refs['pageInfo']['hasNextPage']:
+                return states
+            cursor = refs['pageInfo']['endCursor']
+
+    def _rest_tag_states(self):
+        # The REST tag list has no trees, commits stand in for them
+        states, page = [], 1
+        while True:
+            tags = self._get_json(
+                f"/repos/{self.owner}/{self.repo_name}/tags", {"per_page": TAGS_PAGE_SIZE, "page": page}
+            )
+            states.extend((tag['name'], tag['commit']['sha'], tag['commit']['sha']) for tag in tags)
+            if len(tags) < TAGS_PAGE_SIZE:
+                return states
+            page += 1
+
+    def default_branch(self):
+        return self.repository().get('default_branch') or "No Default Branch"
+
+    def latest_release_tag(self):
+        """
+        Highest version tag reachable from the default branch, like `git
+        describe --tags --abbrev=0` for linear histories. Only the
+        LATEST_TAG_CANDIDATES highest tags are compared with the branch;
+        None if none of them is reachable.
+        """
+        parsed_tags = [(parse_tag(tag), tag) for tag, _, _ in self.tag_states()]
+        candidates = sorted(
+            ((parsed[1], tag) for parsed, tag in parsed_tags if parsed), reverse=True
+        )[:LATEST_TAG_CANDIDATES]
+        default_branch = quote(self.default_branch(), safe='')
+        for _, tag in candidates:
+            try:
+                comparison = self._get_json(
+                    f"/repos/{self.owner}/{self.repo_name}/compare/{quote(tag, safe='')}...{default_branch}"
+                )
+            except RepoSourceError as e:
+                print(f"Error: {e}")
+                return None
+            if comparison.get('status') in ('ahead', 'identical'):
+                return tag
+        return None
+
+    def package_facts(self, ref, subdir=None):
+        paths = packaging_file_paths(subdir)
+        if not has_github_token(self.token):
+            contents = {path: self.read_file(ref, path) for path in paths}
+            blob_ids = {path: git_blob_id(content) if content is not None else None for path, content in contents.items()}
+            contents_by_blob_id = {blob_ids[path]: content for path, content in contents.items() if content is not None}
+            return get_facts_of_blobs(blob_ids, lambda missing: contents_by_blob_id)
+        objects = self._graphql_objects({path: f'expression: {json.dumps(f"{ref}:{path}")}' for path in paths}, 'oid')
+        blob_ids = {path: (blob or {}).get('oid') for path, blob in objects.items()}
+        return get_facts_of_blobs(blob_ids, self._read_blobs)
+
+    def _read_blobs(self, blob_ids):
+        objects = self._graphql_objects({blob_id: f'oid: "{blob_id}"' for blob_id in blob_ids}, 'text')
+        return {blob_id: (blob or {}).get('text') for blob_id, blob in objects.items()}
+
+    def _graphql_objects(self, arguments, fields):
+        # One query for several objects, keyed like arguments (object() arguments of each)
+        keys = list(arguments)
+        selections = '\n'.join(
+            f"o{index}: object({arguments[key]}) {{ ... on Blob {{ {fields} }} }}" for index, key in enumerate(keys)
+        )
+        repository = self._graphql(
+            f"query($owner: String!, $name: String!) {{ repository(owner: $owner, name: $name) {{\n{selections}\n}} }}",
+            {"owner": self.owner, "name": self.repo_name}
+        )
+        return {key: repository.get(f"o{index}") for index, key in enumerate(keys)}
+
+    def read_file(self, ref, path):
+        if has_github_token(self.token):
+            blob = self._graphql_objects({path: f'expression: {json.dumps(f"{ref}:{path}")}'}, 'text')[path]
+            return (blob or {}).get('text')
+        response = self._request(
+            'GET', f"{self.raw_url}/{self.owner}/{self.repo_name}/{quote(ref, safe='/')}/{quote(path, safe='/')}"
+        )
+        if response.status_code == 404:
+            return None
+        if response.status_code != 200:
+            raise RepoSourceError(f"reading {path} at {ref} answered {response.status_code}")
+        return response.content.decode('utf-8', errors='replace')
+
+    def close(self):
+        pass
+
+
+def git_blob_id(content):
+    # Id git gives a blob of this content, so fetched files share the facts cache with clones
+    data = content.encode('utf-8')
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
@@ -0,0 +1,270 @@
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+
+from constants import RESULTS_DB_PATH
+
+VERSION_TYPES = ['django', 'python']
+
+
+def new_run_id():
+    return f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+
+class ResultsStore:
+    """
+    SQLite store of the results saved by main.py.
+
+    Every saved result is kept per run id, the latest result of each
+    dependency is upserted by name, and the first supporting release of
+    every (dependency, django/python, version) is indexed so that questions
+    like "first Django 4.2 release of X" or "all packages lacking Python
+    3.11" don't need the whole updates.json to be parsed.
+    """
+
+    def __init__(self, db_path=RESULTS_DB_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            " run_id TEXT PRIMARY KEY,"
+            " started_at TEXT NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS history ("
+            " run_id TEXT NOT NULL,"
+            " dependency TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " saved_at TEXT NOT NULL,"
+            " PRIMARY KEY (run_id, dependency));"
+            "CREATE TABLE IF NOT EXISTS latest ("
+            " dependency TEXT PRIMARY KEY,"
+            " run_id TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " saved_at TEXT NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS support ("
+            " dependency TEXT NOT NULL,"
+            " version_type TEXT NOT NULL,"
+            " version TEXT NOT NULL,"
+            " release TEXT,"
+            " PRIMARY KEY (dependency, version_type, version));"
+            "CREATE INDEX IF NOT EXISTS support_by_version ON support (version_type, version, release);"
+        )
+        self._connection.commit()
+
+    def start_run(self, run_id=None):
+        run_id = run_id or new_run_id()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR IGNORE INTO runs (run_id, started_at) VALUES (?, ?)",
+                (run_id, datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f'))
+            )
+        return run_id
+
+    def upsert(self, results, run_id, saved_at=None):
+        """
+        results: dict mapping dependency names to their result (the shape
+            written to updates.json by save_update)
+        run_id: run the results belong to, see start_run
+        saved_at: save time to record, defaults to now
+        """
+        saved_at = saved_at or datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR IGNORE INTO runs (run_id, started_at) VALUES (?, ?)", (run_id, saved_at)
+            )
+            for dependency_name, payload in results.items():
+                payload_json = json.dumps(payload)
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO history (run_id, dependency, payload, saved_at) VALUES (?, ?, ?, ?)",
+                    (run_id, dependency_name, payload_json, saved_at)
+                )
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO latest (dependency, run_id, payload, saved_at) VALUES (?, ?, ?, ?)",
+                    (dependency_name, run_id, payload_json, saved_at)
+                )
+                self._connection.execute("DELETE FROM support WHERE dependency = ?", (dependency_name,))
+                self._connection.executemany(
+                    "INSERT INTO support (dependency, version_type, version, release) VALUES (?, ?, ?, ?)",
+                    [
+                        (dependency_name, version_type, version, release)
+                        for version_type in VERSION_TYPES
+                        for version, release in (payload.get(version_type) or {}).items()
+                    ]
+                )
+
+    def get(self, dependency_name):
+        # Latest result of one dependency, or None
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT payload FROM latest WHERE dependency = ?", (dependency_name,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def dependencies(self):
+        with self._lock:
+            return [row[0] for row in self._connection.execute("SELECT dependency FROM latest ORDER BY dependency")]
+
+    def latest_results(self):
+        # Yields {dependency: result} dicts, one per dependency
+        with self._lock:
+            rows = self._connection.execute("SELECT dependency, payload FROM latest ORDER BY rowid").fetchall()
+        for dependency_name, payload in rows:
+            yield {dependency_name: json.loads(payload)}
+
+    def latest_entries(self):
+        # (dependency, result, saved_at) of every dependency
+        with self._lock:
+            rows = self._connection.execute("SELECT dependency, payload, saved_at FROM latest ORDER BY rowid").fetchall()
+        return [(dependency_name, json.loads(payload), saved_at) for dependency_name, payload, saved_at in rows]
+
+    def saved_times(self):
+        # Dict of every dependency with the save time of its latest result
+        with self._lock:
+            return dict(self._connection.execute("SELECT dependency, saved_at FROM latest"))
+
+    def entries_of(self, dependency_names):
+        # (dependency, result, saved_at) of the given dependencies, like latest_entries
+        dependency_names = list(dependency_names)
+        rows = []
+        with self._lock:
+            for start in range(0, len(dependency_names), 500):
+                batch = dependency_names[start:start + 500]
+                rows.extend(self._connection.execute(
+                    f"SELECT dependency, payload, saved_at FROM latest WHERE dependency IN ({','.join('?' * len(batch))})",
+                    batch
+                ))
+        return [(dependency_name, json.loads(payload), saved_at) for dependency_name, payload, saved_at in rows]
+
+    def history(self, dependency_name):
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT run_id, payload FROM history WHERE dependency = ? ORDER BY saved_at",
+                (dependency_name,)
+            ).fetchall()
+        return [(run_id, json.loads(payload)) for run_id, payload in rows]
+
+    def first_release(self, dependency_name, version_type, version):
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT release FROM support WHERE dependency = ? AND version_type = ? AND version = ?",
+                (dependency_name, version_type, version)
+            ).fetchone()
+        return row[0] if row else None
+
+    def lacking(self, version_type, version):
+        # Dependencies probed for the version without any supporting release
+        with self._lock:
+            return [
+                row[0] for row in self._connection.execute(
+                    "SELECT dependency FROM support WHERE version_type = ? AND version = ? AND release IS NULL"
+                    " ORDER BY dependency",
+                    (version_type, version)
+                )
+            ]
+
+    def supporting(self, version_type, version):
+        # Dict of dependencies with their first release supporting the version
+        with self._lock:
+            return dict(self._connection.execute(
+                "SELECT dependency, release FROM support WHERE version_type = ? AND version = ? AND release IS NOT NULL"
+                " ORDER BY dependency",
+                (version_type, version)
+            ))
+
+    def import_jsonl(self, updates_file_path):
+        # Loads an existing updates.json, later lines win like they did for readers of the file
+        run_id = self.start_run(f"import-{os.path.basename(updates_file_path)}")
+        count = 0
+        with open(updates_file_path, 'r') as file:
+            for line in file:
+                if line.strip():
+                    self.upsert(json.loads(line), run_id)
+                    count += 1
+        return count
+
+    def export_jsonl(self, updates_file_path):
+        # Rewrites updates.json with the latest result of every dependency, one line each
+        temp_path = updates_file_path + '.tmp'
+        with open(temp_path, 'w') as file:
+            for results in self.latest_results():
+                json.dump(results, file)
+                file.write("\n")
+        os.replace(temp_path, updates_file_path)
+
+    def compact(self, keep_runs=5):
+        """
+        Drops the history of all but the last keep_runs runs (latest results
+        are always kept) and reclaims the freed space.
+        """
+        with self._lock:
+            with self._connection:
+                kept_runs = [
+                    row[0] for row in self._connection.execute(
+                        "SELECT run_id FROM runs ORDER BY started_at DESC LIMIT ?", (keep_runs,)
+                    )
+                ]
+                placeholders = ','.join('?' * len(kept_runs)) or "''"
+                removed = self._connection.execute(
+                    f"DELETE FROM history WHERE run_id NOT IN ({placeholders})", kept_runs
+                ).rowcount
+                self._connection.execute(
+                    f"DELETE FROM runs WHERE run_id NOT IN ({placeholders})"
+                    " AND run_id NOT IN (SELECT run_id FROM latest)",
+                    kept_runs
+                )
+            self._connection.execute("VACUUM")
+        return removed
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+def open_results_store(updates_file_path="updates.json", db_path=RESULTS_DB_PATH):
+    # Opens the store, seeding it from an existing updates.json on first use
+    store = ResultsStore(db_path)
+    if not store.dependencies() and os.path.exists(updates_file_path):
+        print(f"Imported {store.import_jsonl(updates_file_path)} results from {updates_file_path}")
+    return store
+
+
+def add_arguments(parser):
+    parser.add_argument('--updates-file', default="updates.json")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    compact_parser = subparsers.add_parser('compact', help="drop old history and rewrite updates.json deduplicated")
+    compact_parser.add_argument('--keep-runs', type=int, default=5)
+    show_parser = subparsers.add_parser('show', help="latest result of a dependency")
+    show_parser.add_argument('dependency')
+    first_release_parser = subparsers.add_parser('first-release', help="first release supporting a version")
+    first_release_parser.add_argument('dependency')
+    first_release_parser.add_argument('version_type', choices=VERSION_TYPES)
+    first_release_parser.add_argument('version')
+    lacking_parser = subparsers.add_parser('lacking', help="dependencies lacking support for a version")
+    lacking_parser.add_argument('version_type', choices=VERSION_TYPES)
+    lacking_parser.add_argument('version')
+
+
+def run(args):
+    results_store = open_results_store(args.updates_file)
+    if args.command == 'compact':
+        removed = results_store.compact(args.keep_runs)
+        results_store.export_jsonl(args.updates_file)
+        print(f"Removed {removed} old results, {args.updates_file} now has one line per dependency")
+    elif args.command == 'show':
+        print(json.dumps(results_store.get(args.dependency), indent=2))
+    elif args.command == 'first-release':
+        print(results_store.first_release(args.dependency, args.version_type, args.version))
+    elif args.command == 'lacking':
+        print('\n'.join(results_store.lacking(args.version_type, args.version)))
+    results_store.close()
+
+
+if __name__ == '__main__':
+    main_parser = argparse.ArgumentParser(description="Query and maintain the results store")
+    add_arguments(main_parser)
+    run(main_parser.parse_args())
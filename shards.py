@@ -0,0 +1,137 @@
+import argparse
+import hashlib
+import os
+
+from constants import LINKS_DB_PATH, RESULTS_DB_PATH
+from dashboard_stream import iter_dashboard_dependencies, normalize_name
+from link_store import LinkStore, open_link_store
+from results_store import ResultsStore, new_run_id, open_results_store
+
+UPDATES_FILE_PATH = "updates.json"
+DEPENDENCY_DASHBOARD_CSV_PATH = "dependencies_dashboard.csv"
+MAIN_DASHBOARD_CSV_PATH = "dashboard_main.csv"
+
+
+def parse_shard(text):
+    """
+    Parses a `--shard i/N` value, i counting from 0.
+    Returns (i, N), raises ValueError if it isn't a valid shard.
+    """
+    index, separator, count = text.partition('/')
+    if not separator or not index.isdigit() or not count.isdigit() or not 0 <= int(index) < int(count):
+        raise ValueError(f"invalid shard {text!r}, expected i/N with 0 <= i < N")
+    return int(index), int(count)
+
+
+def shard_argument(text):
+    # argparse type of --shard options
+    try:
+        return parse_shard(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def shard_of(dependency_name, count):
+    # Stable across hosts and runs, unlike hash(), and the same for every spelling of a name
+    digest = hashlib.sha1(normalize_name(dependency_name).encode('utf-8')).hexdigest()
+    return int(digest[:16], 16) % count
+
+
+def in_shard(dependency_name, shard):
+    return shard is None or shard_of(dependency_name, shard[1]) == shard[0]
+
+
+def shard_path(path, shard):
+    """
+    Per-shard variant of an output path, e.g. updates.json ->
+    updates.shard-0-of-4.json. The path itself when not sharded.
+    """
+    if shard is None:
+        return path
+    root, extension = os.path.splitext(path)
+    return f"{root}.shard-{shard[0]}-of-{shard[1]}{extension}"
+
+
+def merge_shards(count, updates_file_path=UPDATES_FILE_PATH,
+                 dependency_dashboard_csv_path=DEPENDENCY_DASHBOARD_CSV_PATH,
+                 main_dashboard_csv_path=MAIN_DASHBOARD_CSV_PATH):
+    """
+    Merges the results and resolved links of shards 0..count-1 into the
+    main stores, then rewrites updates.json and dependencies_dashboard.csv.
+    A dependency found in several shards (e.g. after the shard count
+    changed) keeps its most recently saved result and link.
+
+    Returns a coverage report: dependencies with a result per shard, the
+    missing shards, duplicates, and the dashboard dependencies without a
+    result when dashboard_main.csv is available.
+    """
+    report = {"shards": {}, "missing_shards": [], "duplicates": 0}
+    entries, links = {}, []
+    for index in range(count):
+        shard = (index, count)
+        results_db_path = shard_path(RESULTS_DB_PATH, shard)
+        if not os.path.exists(results_db_path):
+            report['missing_shards'].append(index)
+            continue
+        shard_store = ResultsStore(results_db_path)
+        shard_entries = shard_store.latest_entries()
+        shard_store.close()
+        report['shards'][index] = len(shard_entries)
+        for dependency_name, payload, saved_at in shard_entries:
+            if dependency_name in entries:
+                report['duplicates'] += 1
+                if entries[dependency_name][1] >= saved_at:
+                    continue
+            entries[dependency_name] = (payload, saved_at)
+        links_db_path = shard_path(LINKS_DB_PATH, shard)
+        if os.path.exists(links_db_path):
+            shard_links = LinkStore(links_db_path)
+            links.extend(shard_links.all_links())
+            shard_links.close()
+
+    results_store = open_results_store(updates_file_path)
+    run_id = results_store.start_run(f"merge-{new_run_id()}")
+    for dependency_name, (payload, saved_at) in sorted(entries.items(), key=lambda item: item[1][1]):
+        results_store.upsert({dependency_name: payload}, run_id, saved_at=saved_at)
+    results_store.export_jsonl(updates_file_path)
+    analyzed = set(results_store.dependencies())
+    results_store.close()
+
+    link_store = open_link_store(dependency_dashboard_csv_path)
+    # Oldest first, so the most recently resolved link of a duplicate wins
+    link_store.upsert_many(sorted(links, key=lambda link: link['last_resolved']))
+    link_store.export_csv(dependency_dashboard_csv_path)
+    link_git_supported = {normalize_name(link['dependency']) for link in link_store.all_links() if link['is_git_supported']}
+    link_store.close()
+
+    report['merged'] = len(entries)
+    if os.path.exists(main_dashboard_csv_path):
+        expected = set(iter_dashboard_dependencies(main_dashboard_csv_path, 'dependencies.pypi_all.list'))
+        analyzed_names = {normalize_name(name) for name in analyzed}
+        # Dependencies without a git repository are never analyzed, they don't count as missing
+        missing = sorted(name for name in expected & link_git_supported if name not in analyzed_names)
+        report['expected'] = len(expected & link_git_supported)
+        report['missing'] = missing
+        report['coverage'] = round(1 - len(missing) / report['expected'], 4) if report['expected'] else 1.0
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Merge the outputs of `main.py --shard i/N` runs")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    merge_parser = subparsers.add_parser('merge', help="merge shard results into updates.json and dependencies_dashboard.csv")
+    merge_parser.add_argument('count', type=int, help="number of shards, N")
+    merge_parser.add_argument('--updates-file', default=UPDATES_FILE_PATH)
+    merge_parser.add_argument('--dashboard-file', default=DEPENDENCY_DASHBOARD_CSV_PATH)
+    args = parser.parse_args()
+
+    merge_report = merge_shards(args.count, args.updates_file, args.dashboard_file)
+    for index, result_count in merge_report['shards'].items():
+        print(f"Shard {index}/{args.count}: {result_count} results")
+    if merge_report['missing_shards']:
+        print(f"Missing shards: {merge_report['missing_shards']}")
+    print(f"Merged {merge_report['merged']} dependencies ({merge_report['duplicates']} duplicates) into {args.updates_file}")
+    if 'coverage' in merge_report:
+        print(f"Coverage: {merge_report['coverage']:.1%} of {merge_report['expected']} git hosted dependencies")
+        if merge_report['missing']:
+            print(f"Without results: {merge_report['missing']}")
@@ -0,0 +1,75 @@
+# Path segments of forge URLs pointing inside a repository: <repo>/tree/<ref>/<path>
+TREE_SEGMENTS = ['tree', 'blob', 'src']
+
+
+def get_substring_before_fifth_slash(url):
+    # Split the URL by slashes
+    components = url.split('/')
+
+    # Join the first five components back together
+    substring = '/'.join(components[:5])
+
+    return substring
+
+
+def filter_urls(urls):
+    version_controlling_domains = [
+        'github.com',
+        'gitlab.com',
+        'opendev.org',
+        'bitbucket.org',
+        'logilab.fr',
+        'heptapod.net'
+    ]
+    filtered_urls = []
+
+    for url in urls:
+        num_slashes = url.count('/')
+
+        if num_slashes <= 5 and any(domain in url for domain in version_controlling_domains):
+            filtered_urls.append(get_substring_before_fifth_slash(url) if num_slashes == 5 else url)
+        elif num_slashes > 5 and 'sourceforge.net' in url and url.endswith(("tree/", "tree")):
+            filtered_urls.append(url)
+        elif num_slashes > 5 and 'sdk/storage/azure-storage-blob' in url:  # only for azure-sdk-for-python
+            filtered_urls.append(url)
+
+    return filtered_urls
+
+
+def is_git_supported(url):
+    git_domains = [
+        "github.com",
+        "gitlab.com",
+        "bitbucket.org",
+        "gitea.io",
+        "gitkraken.com",
+        "sourcetreeapp.com",
+        "dev.azure.com",
+        "sourceforge.net"
+    ]
+
+    # Extract domain from the URL
+    domain = url.split('//')[-1].split('/')[0].lower()
+
+    # Check if the domain is in the list of git domains
+    return any(git_domain in domain for git_domain in git_domains)
+
+
+def split_repo_url(url):
+    """
+    Splits a source code link into the repository URL and the subdirectory
+    of the package inside it, for monorepos such as
+    https://github.com/Azure/azure-sdk-for-python/tree/main/sdk/storage/azure-storage-blob
+    The subdirectory is None when the link points at the repository root.
+    """
+    scheme, separator, rest = url.partition('://')
+    if not separator:
+        return url, None
+    parts = rest.rstrip('/').split('/')
+    # host/owner/repository, then /tree/<ref>/<path> (/-/tree/... on GitLab)
+    tail = parts[3:]
+    if tail and tail[0] == '-':
+        tail = tail[1:]
+    if len(tail) >= 2 and tail[0] in TREE_SEGMENTS:
+        return f"{scheme}://{'/'.join(parts[:3])}", '/'.join(tail[2:]) or None
+    return url, None
@@ -0,0 +1,147 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from constants import SUPPORT_TABLE_PATH
+from metrics import get_metrics
+from package_metadata import FACTS_EXTRACTOR_VERSION
+
+
+class SupportTable:
+    """
+    Persistent per-(repository, ref) record of the support declared by the
+    packaging files, so that new target versions are answered from what
+    earlier runs read instead of probing every repository again.
+
+    repositories: the remote fingerprint (see fingerprints) of a repository
+        with its tags, latest release tag and default branch at that time
+    ref_facts: merged packaging file facts (see package_metadata) of a ref,
+        valid while the ref is in the same state: the commit of a tag, or
+        the fingerprint of the repository for branches
+    ref_files: file contents of branches, in the same way
+
+    extractor_version: see FactsCache, facts of another version are ignored
+    """
+
+    def __init__(self, db_path=SUPPORT_TABLE_PATH, extractor_version=FACTS_EXTRACTOR_VERSION):
+        self.db_path = db_path
+        self.extractor_version = extractor_version
+        self.stats = {"hits": 0, "misses": 0}
+        self._lock = threading.Lock()
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(
+            "CREATE TABLE IF NOT EXISTS repositories ("
+            " repository TEXT PRIMARY KEY,"
+            " fingerprint TEXT NOT NULL,"
+            " tag_states TEXT NOT NULL,"
+            " latest_release_tag TEXT,"
+            " default_branch TEXT,"
+            " recorded_at TEXT NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS ref_facts ("
+            " repository TEXT NOT NULL,"
+            " subdir TEXT NOT NULL,"
+            " ref TEXT NOT NULL,"
+            " state TEXT NOT NULL,"
+            " extractor_version INTEGER NOT NULL,"
+            " facts TEXT NOT NULL,"
+            " PRIMARY KEY (repository, subdir, ref));"
+            "CREATE TABLE IF NOT EXISTS ref_files ("
+            " repository TEXT NOT NULL,"
+            " ref TEXT NOT NULL,"
+            " path TEXT NOT NULL,"
+            " state TEXT NOT NULL,"
+            " content TEXT,"
+            " PRIMARY KEY (repository, ref, path));"
+        )
+        self._connection.commit()
+
+    def get_repository(self, repository):
+        # Dict of the recorded repository state, or None
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT fingerprint, tag_states, latest_release_tag, default_branch FROM repositories WHERE repository = ?",
+                (repository,)
+            ).fetchone()
+        if not row:
+            return None
+        return {
+            "fingerprint": row[0],
+            "tag_states": [tuple(state) for state in json.loads(row[1])],
+            "latest_release_tag": row[2],
+            "default_branch": row[3]
+        }
+
+    def record_repository(self, repository, fingerprint, tag_states, latest_release_tag, default_branch):
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO repositories"
+                " (repository, fingerprint, tag_states, latest_release_tag, default_branch, recorded_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (repository, fingerprint, json.dumps(tag_states), latest_release_tag, default_branch,
+                 datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f'))
+            )
+
+    def get_facts(self, repository, subdir, ref, state):
+        # Recorded facts of ref in this state, or None
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT facts FROM ref_facts"
+                " WHERE repository = ? AND subdir = ? AND ref = ? AND state = ? AND extractor_version = ?",
+                (repository, subdir or '', ref, state, self.extractor_version)
+            ).fetchone()
+            self.stats['hits' if row else 'misses'] += 1
+        get_metrics().increment('support_table_hits' if row else 'support_table_misses')
+        return json.loads(row[0]) if row else None
+
+    def record_facts(self, repository, subdir, ref, state, facts):
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO ref_facts (repository, subdir, ref, state, extractor_version, facts)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (repository, subdir or '', ref, state, self.extractor_version, json.dumps(facts))
+            )
+
+    def get_file(self, repository, ref, path, state):
+        # (True, content) if recorded, content being None for a missing file, else (False, None)
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT content FROM ref_files WHERE repository = ? AND ref = ? AND path = ? AND state = ?",
+                (repository, ref, path, state)
+            ).fetchone()
+        return (True, row[0]) if row else (False, None)
+
+    def record_file(self, repository, ref, path, state, content):
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO ref_files (repository, ref, path, state, content) VALUES (?, ?, ?, ?, ?)",
+                (repository, ref, path, state, content)
+            )
+
+    def report(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['repositories'] = self._connection.execute("SELECT COUNT(*) FROM repositories").fetchone()[0]
+            stats['refs'] = self._connection.execute("SELECT COUNT(*) FROM ref_facts").fetchone()[0]
+        return stats
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+_support_table = None
+_support_table_lock = threading.Lock()
+
+
+def get_support_table():
+    global _support_table
+    with _support_table_lock:
+        if _support_table is None:
+            _support_table = SupportTable()
+        return _support_table